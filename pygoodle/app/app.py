@@ -12,7 +12,6 @@ from typing import Any, List, Optional, Type, Union
 
 import argcomplete
 import pygoodle.reflection as reflect
-from trio import MultiError
 
 from ..console import CONSOLE
 from .argument import Argument
@@ -61,10 +60,6 @@ class App:
             CONSOLE.stderr('** CalledProcessError **')
             CONSOLE.stderr(err)
             exit(err.returncode)
-        except MultiError as err:
-            CONSOLE.stderr('** MultiError **')
-            CONSOLE.stderr(err.exceptions)
-            exit(1)
         except OSError as err:
             CONSOLE.stderr('** OSError **')
             CONSOLE.stderr(err)
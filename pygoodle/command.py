@@ -7,17 +7,17 @@
 import os
 import subprocess
 from pathlib import Path
-from subprocess import CompletedProcess, PIPE, STDOUT
-from typing import List, Optional, Union
+from subprocess import CompletedProcess, DEVNULL, PIPE, STDOUT
+from typing import Iterator, List, Optional, Union
 
 from .console import CONSOLE
 from .format import Format
 
 
-def get_stdout(command: str, cwd: Path = Path.cwd()) -> Optional[str]:
+def get_stdout(command: Union[str, List[str]], cwd: Path = Path.cwd(), shell: bool = True) -> Optional[str]:
     if not cwd.is_dir():
         return None
-    result = run(command, cwd=cwd, print_output=False, check=False)
+    result = run(command, cwd=cwd, print_output=False, check=False, shell=shell)
     if result.returncode != 0:
         return None
     output: str = result.stdout
@@ -27,14 +27,41 @@ def get_stdout(command: str, cwd: Path = Path.cwd()) -> Optional[str]:
     return output
 
 
-def run_silent(command: str, cwd: Path = Path.cwd()) -> CompletedProcess:
-    return run(command, cwd=cwd, check=False, print_output=False)
+def iter_stdout(command: List[str], cwd: Path = Path.cwd(), check: bool = False) -> Iterator[str]:
+    """Yield stdout lines as the command writes them, stopping the command if iteration ends early
+
+    :param List[str] command: Command arguments
+    :param Path cwd: Directory to run command in
+    :param bool check: Whether to raise CalledProcessError once all output is read if the command failed
+    :return: Iterator of stdout lines
+    """
+
+    if not cwd.is_dir():
+        if check:
+            raise subprocess.CalledProcessError(1, command)
+        return
+    process = subprocess.Popen(command, cwd=cwd, stdout=PIPE, stderr=DEVNULL, universal_newlines=True)
+    try:
+        for line in process.stdout:
+            yield line.rstrip('\n')
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+
+
+def run_silent(command: Union[str, List[str]], cwd: Path = Path.cwd(), shell: bool = True) -> CompletedProcess:
+    return run(command, cwd=cwd, check=False, print_output=False, shell=shell)
 
 
 def run(command: Union[str, List[str]], cwd: Path = Path.cwd(), check: bool = True,
         env: Optional[dict] = None, stdout=PIPE, stderr=STDOUT,
         print_output: Optional[bool] = None, print_command: bool = False,
-        login: bool = False, interactive: bool = False, executable: Optional[str] = None) -> CompletedProcess:
+        login: bool = False, interactive: bool = False, executable: Optional[str] = None,
+        shell: bool = True) -> CompletedProcess:
 
     if print_output is None:
         print_output = CONSOLE.print_output
@@ -53,12 +80,14 @@ def run(command: Union[str, List[str]], cwd: Path = Path.cwd(), check: bool = Tr
     # else:
     #     cmd = command
 
-    if isinstance(command, str):
-        command = [command]
-    if login:
-        command = ['-l'] + command
-    if interactive:
-        command = ['-i'] + command
+    # With shell=False, command is a list of arguments exec'd directly without an intermediate shell process
+    if shell:
+        if isinstance(command, str):
+            command = [command]
+        if login:
+            command = ['-l'] + command
+        if interactive:
+            command = ['-i'] + command
 
     cmd_env = os.environ.copy()
     if env is not None:
@@ -73,7 +102,7 @@ def run(command: Union[str, List[str]], cwd: Path = Path.cwd(), check: bool = Tr
         command,
         cwd=cwd,
         env=cmd_env,
-        shell=True,
+        shell=shell,
         stdout=stdout,
         stderr=stderr,
         universal_newlines=True,
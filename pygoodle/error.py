@@ -23,3 +23,7 @@ class UnknownArgumentError(Exception):
 
 class GitError(Exception):
     pass
+
+
+class SecureShellError(Exception):
+    pass
@@ -180,12 +180,12 @@ def has_contents(path: Path) -> bool:
 
 
 def is_empty_dir(path: Path) -> bool:
-    if not path.exists() or not path.is_dir():
+    try:
+        # Stop at the first entry instead of listing the whole directory
+        with os.scandir(path) as entries:
+            return next(entries, None) is None
+    except (FileNotFoundError, NotADirectoryError):
         raise Exception(f"Directory at {path} doesn't exist")
-    if not os.listdir(path):
-        return True
-    else:
-        return False
 
 
 def create_file(path: Path, contents: str) -> None:
@@ -65,7 +65,7 @@ class DirectoryInfo:
             raise Exception('Size can only be calculated when recursive')
         if not self.files:
             return 0
-        return sum([f.size for f in self.files])
+        return sum(f.size for f in self.files)
 
     @property
     def directories(self) -> List[Path]:
@@ -185,7 +185,7 @@ class FTP:
     def _get_directory_size(self, directory: Path) -> int:
         with self.reserve_ftp() as ftp:
             directory_info = DirectoryInfo(ftp, directory)
-        size = sum([f.size for f in directory_info.files])
+        size = sum(f.size for f in directory_info.files)
         return size
 
     def _get_download_path(self, path: Path) -> Path:
@@ -13,6 +13,8 @@ from .constants import (
     GITMODULES
 )
 
+from .cache import cache_session
+
 from .model.factory import AllBranches
 from .model.branch.branch import Branch
 from .model.commit import Commit
@@ -0,0 +1,160 @@
+"""git metadata cache
+
+.. codeauthor:: Joe DeCapo <joe@polka.cat>
+
+"""
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, List, TypeVar
+
+CACHE_SIZE: int = 256
+
+T = TypeVar('T')
+
+_caches: List[OrderedDict] = []
+_generation: int = 0
+_lock: threading.Lock = threading.Lock()
+# Threads with an open session, the cache is cleared when the first one opens and the last one closes
+_sessions: int = 0
+_local = threading.local()
+
+
+def cached(func):
+    """Memoize read only git query within a cache session, until the next cache invalidation
+
+    Outside of a cache session the query always runs. Results of queries that overlap an invalidation or call
+    :func:`skip_caching` aren't stored. Cached results are shared between callers and must not be mutated
+    """
+
+    cache: OrderedDict = OrderedDict()
+    _caches.append(cache)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        """Wrapper"""
+
+        if not caching_enabled():
+            return func(*args, **kwargs)
+        key = (args, tuple(sorted(kwargs.items())))
+        with _lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+            generation = _generation
+        skipped = getattr(_local, 'skipped', False)
+        _local.skipped = False
+        try:
+            result = func(*args, **kwargs)
+            store = not _local.skipped
+        finally:
+            # Queries built on a skipped result aren't stored either
+            _local.skipped = skipped or _local.skipped
+        with _lock:
+            if store and generation == _generation:
+                cache[key] = result
+                if len(cache) > CACHE_SIZE:
+                    cache.popitem(last=False)
+        return result
+
+    wrapper.cache_clear = cache.clear
+    return wrapper
+
+
+@contextmanager
+def cache_session() -> Iterator[None]:
+    """Cache git queries made by the current thread until the end of the block
+
+    Changes made by pygoodle invalidate the cache, but changes made to repos any other way during the block aren't
+    seen by cached queries. Sessions can be nested, and threads with open sessions share cached results. Use
+    :func:`in_cache_session` to carry a session over to worker threads
+    """
+
+    global _sessions
+    depth = getattr(_local, 'depth', 0)
+    if not depth:
+        with _lock:
+            if not _sessions:
+                _invalidate()
+            _sessions += 1
+    _local.depth = depth + 1
+    try:
+        yield
+    finally:
+        _local.depth = depth
+        if not depth:
+            with _lock:
+                _sessions -= 1
+                if not _sessions:
+                    _invalidate()
+
+
+def caching_enabled() -> bool:
+    """Whether a cache session is open in the current thread"""
+
+    return getattr(_local, 'depth', 0) > 0
+
+
+def in_cache_session(func: Callable[..., T]) -> Callable[..., T]:
+    """Run function in a cache session if the calling thread has one open, for passing to worker threads
+
+    :param Callable[..., T] func: Function to wrap
+    :return: Function entering a cache session before calling func, or func if no session is open
+    """
+
+    if not caching_enabled():
+        return func
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        """Wrapper"""
+
+        with cache_session():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def skip_caching() -> None:
+    """Don't store the result of the running cached query, such as a fallback value returned after git failed"""
+
+    _local.skipped = True
+
+
+def invalidates_cache(func):
+    """Invalidate cached git queries after wrapped function modifies repo state"""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        """Wrapper"""
+
+        try:
+            return func(*args, **kwargs)
+        finally:
+            invalidate_cache()
+
+    return wrapper
+
+
+def invalidate_cache() -> None:
+    """Clear all cached git queries"""
+
+    with _lock:
+        _invalidate()
+
+
+def _invalidate() -> None:
+    """Clear all cached git queries, must be called with lock held"""
+
+    global _generation
+    _generation += 1
+    for cache in _caches:
+        cache.clear()
+
+
+def cache_generation() -> int:
+    """Number of cache invalidations, for memoized values stored outside of this module"""
+
+    return _generation
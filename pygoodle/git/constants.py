@@ -1,5 +1,6 @@
 """git constants"""
 
+import os
 from typing import Dict
 
 GitConfig = Dict[str, str]
@@ -9,3 +10,20 @@ ORIGIN: str = 'origin'
 FETCH_URL: str = 'fetch_url'
 PUSH_URL: str = 'push_url'
 GITMODULES: str = '.gitmodules'
+
+MAX_JOBS: int = 8
+
+
+def _submodule_jobs() -> int:
+    """Submodule jobs from PYGOODLE_SUBMODULE_JOBS, ignoring values that aren't integers"""
+
+    default = min(MAX_JOBS, os.cpu_count() or 4)
+    try:
+        jobs = int(os.environ.get('PYGOODLE_SUBMODULE_JOBS', default))
+    except ValueError:
+        jobs = default
+    # Clamped to at least one, since newer git versions reject --jobs 0
+    return max(1, jobs)
+
+
+SUBMODULE_JOBS: int = _submodule_jobs()
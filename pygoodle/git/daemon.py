@@ -0,0 +1,154 @@
+"""Long running git processes
+
+.. codeauthor:: Joe DeCapo <joe@polka.cat>
+
+"""
+
+import atexit
+import subprocess
+from pathlib import Path
+from subprocess import DEVNULL, PIPE, Popen
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from .cache import cache_generation, caching_enabled
+
+
+BATCH_CHECK: str = '--batch-check'
+BATCH: str = '--batch'
+
+
+class GitDaemon:
+    """Persistent ``git cat-file`` processes per repo, for resolving revisions and reading objects without spawning git
+
+    Only used within a cache session, since a long running process may not see changes made to the repo by others.
+    Processes are restarted after the git cache is invalidated, so lookups see the same repo state as cached queries
+    """
+
+    _processes: Dict[Tuple[Path, str], Popen] = {}
+    _generation: int = cache_generation()
+    _lock: Lock = Lock()
+    disabled: bool = False
+
+    @classmethod
+    def resolve(cls, path: Path, rev: str) -> Optional[str]:
+        """Resolve revision to full object sha
+
+        :param Path path: Path to git repo
+        :param str rev: Revision to resolve
+        :return: Object sha, or None if revision couldn't be resolved by the daemon
+        """
+
+        with cls._lock:
+            header = cls._request(path, BATCH_CHECK, rev)
+        if header is None:
+            return None
+        return header[0]
+
+    @classmethod
+    def read_object(cls, path: Path, rev: str) -> Optional[Tuple[str, bytes]]:
+        """Read raw object contents
+
+        :param Path path: Path to git repo
+        :param str rev: Revision of object to read
+        :return: Object type and contents, or None if object couldn't be read by the daemon
+        """
+
+        with cls._lock:
+            header = cls._request(path, BATCH, rev)
+            if header is None:
+                return None
+            _, object_type, size = header
+            process = cls._processes[(path, BATCH)]
+            try:
+                # Contents are followed by a newline
+                contents = process.stdout.read(int(size) + 1)
+            except OSError:
+                contents = b''
+            if len(contents) != int(size) + 1:
+                cls._close(path, BATCH)
+                return None
+        return object_type, contents[:-1]
+
+    @classmethod
+    def _request(cls, path: Path, mode: str, rev: str) -> Optional[Tuple[str, str, str]]:
+        """Write revision to daemon and read the object header, must be called with lock held"""
+
+        if cls.disabled or not caching_enabled() or not rev or any(c.isspace() for c in rev):
+            return None
+        generation = cache_generation()
+        if cls._generation != generation:
+            cls._close_all()
+            cls._generation = generation
+        process = cls._process(path, mode)
+        if process is None:
+            return None
+        try:
+            process.stdin.write(f'{rev}\n'.encode())
+            process.stdin.flush()
+            output = process.stdout.readline()
+        except OSError:
+            cls._close(path, mode)
+            return None
+        if not output:
+            cls._close(path, mode)
+            return None
+        parts = output.decode().split()
+        # Expected output:
+        # <sha> <type> <size>
+        # <rev> missing
+        if len(parts) != 3:
+            return None
+        return parts[0], parts[1], parts[2]
+
+    @classmethod
+    def close(cls, path: Path) -> None:
+        """Stop daemons for repo
+
+        :param Path path: Path to git repo
+        """
+
+        with cls._lock:
+            cls._close(path, BATCH_CHECK)
+            cls._close(path, BATCH)
+
+    @classmethod
+    def close_all(cls) -> None:
+        """Stop all daemons"""
+
+        with cls._lock:
+            cls._close_all()
+
+    @classmethod
+    def _process(cls, path: Path, mode: str) -> Optional[Popen]:
+        process = cls._processes.get((path, mode))
+        if process is not None and process.poll() is None:
+            return process
+        if not path.is_dir():
+            return None
+        try:
+            process = Popen(['git', 'cat-file', mode], cwd=path, stdin=PIPE, stdout=PIPE, stderr=DEVNULL)
+        except OSError:
+            return None
+        cls._processes[(path, mode)] = process
+        return process
+
+    @classmethod
+    def _close(cls, path: Path, mode: str) -> None:
+        process = cls._processes.pop((path, mode), None)
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+        process.stdout.close()
+
+    @classmethod
+    def _close_all(cls) -> None:
+        for path, mode in list(cls._processes):
+            cls._close(path, mode)
+
+
+atexit.register(GitDaemon.close_all)
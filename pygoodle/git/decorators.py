@@ -1,5 +1,6 @@
 """git constants"""
 
+import os
 from functools import wraps
 from typing import Callable, Union
 
@@ -7,6 +8,9 @@ from pygoodle.console import CONSOLE
 from pygoodle.git.offline import GitOffline
 from pygoodle.git.log import GIT_LOG
 
+# Skip error message wrappers, for batch operations where errors abort anyway
+FAIL_FAST: bool = os.environ.get('PYGOODLE_FAIL_FAST', '').lower() in ('1', 'true', 'yes')
+
 
 def output_msg(message: Union[Callable, str]):
     def decorator(func):
@@ -25,16 +29,20 @@ def output_msg(message: Union[Callable, str]):
 
 def error_msg(message: Union[Callable, str]):
     def decorator(func):
+        if FAIL_FAST:
+            return func
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            if isinstance(message, Callable):
-                instance = args[0]
-                msg: str = message(instance)
-            else:
-                msg: str = str(message)
             try:
                 return func(*args, **kwargs)
             except Exception:
+                # Only build the message when it's needed
+                if isinstance(message, Callable):
+                    instance = args[0]
+                    msg: str = message(instance)
+                else:
+                    msg: str = str(message)
                 GIT_LOG.error(msg)
                 raise
         return wrapper
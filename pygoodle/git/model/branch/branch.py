@@ -21,6 +21,8 @@ class Branch(Ref):
     :ivar str formatted_ref: Formatted ref
     """
 
+    __slots__ = ('name', '_short_ref', '_formatted_ref')
+
     def __init__(self, path: Path, name: str):
         """Branch __init__
 
@@ -30,6 +32,8 @@ class Branch(Ref):
 
         super().__init__(path)
         self.name: str = name
+        self._short_ref: str = self.truncate_ref(name)
+        self._formatted_ref: str = self.format_git_branch(name)
         self.check_ref_format(self.formatted_ref)
 
     def __eq__(self, other) -> bool:
@@ -62,13 +66,13 @@ class Branch(Ref):
     def short_ref(self) -> str:
         """Short git ref"""
 
-        return self.truncate_ref(self.name)
+        return self._short_ref
 
     @property
     def formatted_ref(self) -> str:
         """Formatted git ref"""
 
-        return self.format_git_branch(self.name)
+        return self._formatted_ref
 
     def checkout(self, check: bool = True, track: bool = False) -> None:
         current_branch = GitOffline.current_branch(self.path)
@@ -10,6 +10,7 @@ from pygoodle.console import CONSOLE
 from pygoodle.format import Format
 # from pygoodle.git.decorators import error_msg
 from pygoodle.git.model.commit import Commit
+from pygoodle.git.model.lazy_factory import git_factory
 from pygoodle.git.offline import GitOffline
 from pygoodle.git.online import GitOnline
 
@@ -23,14 +24,14 @@ class LocalBranch(Branch):
     :ivar str name: Branch name
     """
 
+    __slots__ = ()
+
     def __lt__(self, other: 'LocalBranch') -> bool:
         return self.name < other.name
 
     @property
     def is_tracking_branch(self) -> bool:
-        from pygoodle.git.model.factory import GitFactory
-        branches = GitFactory.get_tracking_branches(self.path)
-        return any([branch.name == self.name for branch in branches])
+        return self.name in GitOffline.get_tracking_branches_info(self.path)
 
     @property
     def sha(self) -> Optional[str]:
@@ -66,13 +67,11 @@ class LocalBranch(Branch):
 
     @property
     def exists(self) -> bool:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.has_local_branch(self.path, self.name)
+        return git_factory().has_local_branch(self.path, self.name)
 
     @property
     def commit(self) -> Commit:
-        sha = GitOffline.get_branch_sha(self.path, branch=self.name)
-        return Commit(self.path, sha)
+        return Commit(self.path, self.sha)
 
     # @error_msg('Failed to push local changes')
     # @not_detached
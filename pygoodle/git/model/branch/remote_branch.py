@@ -13,6 +13,7 @@ from pygoodle.git.constants import ORIGIN
 from pygoodle.format import Format
 # from pygoodle.git.decorators import error_msg
 from pygoodle.git.model.commit import Commit
+from pygoodle.git.model.lazy_factory import git_factory
 from pygoodle.git.offline import GitOffline
 from pygoodle.git.online import GitOnline
 
@@ -27,6 +28,8 @@ class RemoteBranch(Branch):
     :ivar str formatted_ref: Formatted ref
     """
 
+    __slots__ = ('remote', 'is_default')
+
     def __init__(self, path: Path, name: str, remote: Optional[str] = None, is_default: bool = False):
         """Branch __init__
 
@@ -47,7 +50,7 @@ class RemoteBranch(Branch):
         return False
 
     def __lt__(self, other: 'RemoteBranch') -> bool:
-        return f'{self.remote.name}/{self.name}' < f'{other.remote.name}/{other.name}'
+        return (self.remote.name, self.name) < (other.remote.name, other.name)
 
     @property
     def short_ref(self) -> str:
@@ -64,8 +67,7 @@ class RemoteBranch(Branch):
 
     @property
     def is_tracking_branch(self) -> bool:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.has_tracking_branch(self.path, self.name)
+        return git_factory().has_tracking_branch(self.path, self.name)
 
     @property
     def sha(self) -> Optional[str]:
@@ -74,8 +76,7 @@ class RemoteBranch(Branch):
 
     # @error_msg('Failed to delete remote branch')
     def delete(self) -> None:
-        from pygoodle.git.model.factory import GitFactory
-        if not GitFactory.has_remote_branch_online(self.path, self.name, self.remote.name):
+        if not git_factory().has_remote_branch_online(self.path, self.name, self.remote.name):
             CONSOLE.stdout(f" - Remote branch {Format.Git.ref(self.name)} doesn't exist")
             return
         CONSOLE.stdout(f' - Delete remote branch {Format.Git.ref(self.name)}')
@@ -83,17 +84,14 @@ class RemoteBranch(Branch):
 
     @property
     def exists(self) -> bool:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.has_remote_branch_offline(self.path, self.name, self.remote.name)
+        return git_factory().has_remote_branch_offline(self.path, self.name, self.remote.name)
 
     def exists_online(self, url: Optional[str] = None) -> bool:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.has_remote_branch_online(self.path, branch=self.name, remote=self.remote.name, url=url)
+        return git_factory().has_remote_branch_online(self.path, branch=self.name, remote=self.remote.name, url=url)
 
     # @error_msg('Failed to create remote branch')
     def create(self, branch: Optional[str] = None, remote: Optional[str] = None) -> None:
-        from pygoodle.git.model.factory import GitFactory
-        if GitFactory.has_remote_branch_online(self.path, self.name, self.remote.name):
+        if git_factory().has_remote_branch_online(self.path, self.name, self.remote.name):
             CONSOLE.stdout(f' - Remote branch {Format.Git.ref(self.name)} already exists')
             return
         CONSOLE.stdout(f' - Create remote branch {Format.Git.ref(self.name)}')
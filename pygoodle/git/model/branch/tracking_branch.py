@@ -10,6 +10,7 @@ from typing import Optional
 from pygoodle.console import CONSOLE
 from pygoodle.git.constants import ORIGIN
 # from pygoodle.git.decorators import not_detached
+from pygoodle.git.model.lazy_factory import git_factory
 from pygoodle.git.offline import GitOffline
 from pygoodle.git.online import GitOnline
 from pygoodle.format import Format
@@ -28,6 +29,8 @@ class TrackingBranch(Branch):
     :ivar str formatted_ref: Formatted ref
     """
 
+    __slots__ = ('local_branch', 'upstream_branch', 'push_branch')
+
     def __init__(self, path: Path, local_branch: str,
                  upstream_branch: Optional[str] = None, upstream_remote: Optional[str] = None,
                  push_branch: Optional[str] = None, push_remote: Optional[str] = None):
@@ -48,13 +51,13 @@ class TrackingBranch(Branch):
         return False
 
     def __lt__(self, other: 'TrackingBranch') -> bool:
-        return f'{self.name}/{self.upstream_branch.remote.name}/{self.upstream_branch.name}' \
-               < f'{other.name}/{other.upstream_branch.remote.name}/{other.upstream_branch.name}'
+        return (self.name, self.upstream_branch.remote.name, self.upstream_branch.name) \
+            < (other.name, other.upstream_branch.remote.name, other.upstream_branch.name)
 
     @property
     def sha(self) -> Optional[str]:
         """Commit sha"""
-        raise self.local_branch.sha
+        return self.local_branch.sha
 
     def delete(self, force: bool = False) -> None:
         self.local_branch.delete(force=force)
@@ -66,8 +69,7 @@ class TrackingBranch(Branch):
 
     @property
     def exists(self) -> bool:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.has_tracking_branch(self.path, self.name)
+        return git_factory().has_tracking_branch(self.path, self.name)
 
     # @error_msg('Failed to set tracking branch')
     def set_upstream(self) -> None:
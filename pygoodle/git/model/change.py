@@ -23,6 +23,8 @@ class Change:
     :ivar Path path: Path to git repo
     """
 
+    __slots__ = ('path', 'file_path', 'old_sha', 'new_sha', 'old_permissions', 'new_permissions', 'change_type')
+
     def __init__(self, path: Path, file_path: Path, change_type: str, old_sha: str, new_sha: str,
                  old_permissions: str, new_permissions: str):
         """Ref __init__
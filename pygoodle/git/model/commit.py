@@ -21,6 +21,8 @@ class Commit(Ref):
     :ivar str formatted_ref: Formatted ref
     """
 
+    __slots__ = ('_sha',)
+
     def __init__(self, path: Path, sha: str):
         """GitRepo __init__
 
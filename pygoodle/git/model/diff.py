@@ -17,6 +17,8 @@ class Diff:
     :ivar Path path: Path to git repo
     """
 
+    __slots__ = ('path', 'added', 'modified', 'deleted')
+
     def __init__(self, path: Path, changes: List[Change]):
         """Ref __init__
 
@@ -31,7 +33,7 @@ class Diff:
     @property
     def has_changes(self) -> bool:
         changes = [self.added, self.modified, self.deleted]
-        return not any([len(c) > 0 for c in changes])
+        return not any(len(c) > 0 for c in changes)
 
     @property
     def has_added_files(self) -> bool:
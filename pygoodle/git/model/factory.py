@@ -4,9 +4,14 @@
 
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
 
+from pygoodle.git.cache import cache_session, in_cache_session
+from pygoodle.git.constants import FETCH_URL, MAX_JOBS, PUSH_URL
 from pygoodle.git.offline import GitOffline
 from pygoodle.git.online import GitOnline
 
@@ -23,11 +28,11 @@ from .tag.remote_tag import RemoteTag
 
 class AllBranches:
 
+    __slots__ = ('local_branches', 'remote_branches', 'tracking_branches')
+
     def __init__(self, local_branches: List[LocalBranch], remote_branches: List[RemoteBranch],
                  tracking_branches: List[TrackingBranch]):
 
-        local_branches = [b for b in local_branches if not b.is_tracking_branch]
-        remote_branches = [b for b in remote_branches if not b.is_tracking_branch]
         self.local_branches: Tuple[LocalBranch, ...] = tuple(local_branches)
         self.remote_branches: Tuple[RemoteBranch, ...] = tuple(remote_branches)
         self.tracking_branches: Tuple[TrackingBranch, ...] = tuple(tracking_branches)
@@ -54,8 +59,7 @@ class GitFactory:
     @classmethod
     def get_remotes(cls, path: Path) -> List[Remote]:
         remotes = GitOffline.get_remotes_info(path)
-        remotes = [Remote(path, name) for name in remotes.keys()]
-        return sorted(remotes)
+        return [Remote(path, name) for name in sorted(remotes)]
 
     @classmethod
     def has_remote(cls, path: Path, remote: Optional[str] = None, fetch_url: Optional[str] = None,
@@ -66,53 +70,73 @@ class GitFactory:
     @classmethod
     def get_remote(cls, path: Path, remote: Optional[str] = None, fetch_url: Optional[str] = None,
                    push_url: Optional[str] = None) -> Optional[Remote]:
-        remotes = GitFactory.get_remotes(path)
-        if remote is not None:
-            remotes = [r for r in remotes if r.name == remote]
-        if fetch_url is not None:
-            remotes = [r for r in remotes if r.fetch_url == fetch_url]
-        if push_url is not None:
-            remotes = [r for r in remotes if r.push_url == push_url]
-        return remotes[0] if remotes else None
+        remotes = GitOffline.get_remotes_info(path)
+        if remote is None:
+            names = sorted(remotes)
+        else:
+            names = [remote] if remote in remotes else []
+        for name in names:
+            if fetch_url is not None and remotes[name].get(FETCH_URL) != fetch_url:
+                continue
+            if push_url is not None and remotes[name].get(PUSH_URL) != push_url:
+                continue
+            return Remote(path, name)
+        return None
 
     @classmethod
-    def get_local_branches(cls, path: Path) -> List[LocalBranch]:
+    def get_local_branches(cls, path: Path, exclude: FrozenSet[str] = frozenset()) -> List[LocalBranch]:
         branches = GitOffline.get_local_branches_info(path)
-        branches = [LocalBranch(path, branch) for branch in branches]
-        return sorted(branches)
+        # git lists refs sorted by refname
+        return [LocalBranch(path, branch) for branch in branches if branch not in exclude]
 
     @classmethod
     def get_local_tags(cls, path: Path) -> List[LocalTag]:
         tags = GitOffline.get_local_tags_info(path)
-        tags = [LocalTag(path, tag) for tag in tags]
-        return sorted(tags)
+        # git lists refs sorted by refname
+        return [LocalTag(path, tag) for tag in tags]
+
+    @classmethod
+    def get_local_tag_names(cls, path: Path) -> List[str]:
+        """Local tag names without building tag objects, for scanning large numbers of tags"""
+
+        return list(GitOffline.get_local_tags_info(path))
+
+    @classmethod
+    def get_local_tag_shas(cls, path: Path) -> Dict[str, str]:
+        """Commit sha of every local tag keyed by name, without building tag objects"""
+
+        return dict(GitOffline.get_local_tag_commits_info(path))
+
+    @classmethod
+    def get_local_tags_named(cls, path: Path, tags: Iterable[str]) -> List[LocalTag]:
+        """Build tag objects only for the given names that exist locally, in the order given"""
+
+        existing_tags = GitOffline.get_local_tags_info(path)
+        return [LocalTag(path, tag) for tag in dict.fromkeys(tags) if tag in existing_tags]
 
     @classmethod
     def get_submodule(cls, path: Path, submodule_path: Path) -> Optional[Remote]:
         submodules = GitFactory.get_submodules(path)
         full_path = path / submodule_path
-        submodule = [s for s in submodules if s.path == full_path]
-        return submodule[0] if submodule else None
+        return next((s for s in submodules if s.path == full_path), None)
 
     @classmethod
     def get_submodules(cls, path: Path) -> List[Submodule]:
         submodules_info = GitOffline.get_submodules_info(path)
+        if not submodules_info:
+            return []
+        commits = GitOffline.get_submodule_commits_info(path, tuple(submodules_info))
         submodules = []
-        for key in submodules_info.keys():
-            submodule_info = submodules_info[key]
+        for submodule_path, submodule_info in submodules_info.items():
             # TODO: Save url from config and gitmodules
-            url = submodule_info['url']
-            submodule_path = Path(key)
-            branch = submodule_info['branch'] if 'branch' in submodule_info else None
-            active = submodule_info['active'] if 'active' in submodule_info else None
-            active = True if active == 'true' else False
-            submodule_commit = GitOffline.get_submodule_commit(path, submodule_path)
-            submodule = Submodule(path, submodule_path, url=url, commit=submodule_commit, branch=branch, active=active)
+            submodule = Submodule(path, Path(submodule_path),
+                                  url=submodule_info['url'],
+                                  commit=commits.get(submodule_path),
+                                  branch=submodule_info.get('branch'),
+                                  active=submodule_info.get('active') == 'true')
             submodules.append(submodule)
-            recursive_submodules = GitFactory.get_submodules(submodule.path)
-            if recursive_submodules:
-                submodules += recursive_submodules
-        return sorted(submodules)
+            submodules += GitFactory.get_submodules(submodule.path)
+        return sorted(submodules, key=attrgetter('path'))
 
     @classmethod
     def has_submodule(cls, path: Path, submodule_path: Path) -> bool:
@@ -122,22 +146,55 @@ class GitFactory:
     @classmethod
     def get_tracking_branches(cls, path: Path) -> List[TrackingBranch]:
         branches = GitOffline.get_tracking_branches_info(path)
-        tracking_branches = []
-        for local_branch, info in branches.items():
-            tracking_branch = TrackingBranch(path,
-                                             local_branch=local_branch,
-                                             upstream_branch=info['upstream_branch'],
-                                             upstream_remote=info['upstream_remote'],
-                                             push_branch=info['push_branch'],
-                                             push_remote=info['push_remote'])
-            tracking_branches.append(tracking_branch)
-        return sorted(tracking_branches)
+        # Tracking branch info follows local branches, which git lists sorted by refname
+        return [GitFactory._tracking_branch(path, branch, info) for branch, info in branches.items()]
+
+    @classmethod
+    def _tracking_branch(cls, path: Path, local_branch: str, info: Dict[str, str]) -> TrackingBranch:
+        return TrackingBranch(path,
+                              local_branch=local_branch,
+                              upstream_branch=info['upstream_branch'],
+                              upstream_remote=info['upstream_remote'],
+                              push_branch=info['push_branch'],
+                              push_remote=info['push_remote'])
+
+    @classmethod
+    def prefetch(cls, paths: Iterable[Path], max_workers: int = MAX_JOBS) -> None:
+        """Fill cached ref, remote and submodule listings for many repos concurrently
+
+        Each listing is an independent git process, so repos are queried in parallel. Only useful within a cache
+        session, where later factory calls for the repos are served from the cache
+
+        :param Iterable[Path] paths: Paths to git repos
+        :param int max_workers: Maximum number of git processes run in parallel
+        """
+
+        queries = [GitOffline.get_refs_info, GitOffline.get_remotes_info, GitOffline.get_submodules_info]
+        calls = [(query, path) for path in dict.fromkeys(paths) for query in queries]
+        if not calls:
+            return
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(calls))) as executor:
+            list(executor.map(in_cache_session(lambda call: call[0](call[1])), calls))
 
     @classmethod
     def get_all_branches(cls, path: Path, online: bool = False) -> AllBranches:
-        local_branches = GitFactory.get_local_branches(path)
-        remote_branches = GitFactory.get_all_remote_branches(path, online=online)
-        tracking_branches = GitFactory.get_tracking_branches(path)
+        # Listings share one snapshot of the repo's refs for the duration of the call
+        with cache_session():
+            if online:
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    # Remote branches don't depend on tracking branches, so list them while tracking branches resolve
+                    remote_future = executor.submit(in_cache_session(GitFactory.get_all_remote_branches), path,
+                                                    online=online)
+                    tracking_branches = GitFactory.get_tracking_branches(path)
+                    remote_branches = remote_future.result()
+            else:
+                # Offline listings all come from the same cached for-each-ref call, so a thread would only add overhead
+                tracking_branches = GitFactory.get_tracking_branches(path)
+                remote_branches = GitFactory.get_all_remote_branches(path)
+            tracking_names = frozenset(b.name for b in tracking_branches)
+            local_branches = GitFactory.get_local_branches(path, exclude=tracking_names)
+        upstream_names = frozenset((b.upstream_branch.remote.name, b.upstream_branch.name) for b in tracking_branches)
+        remote_branches = [b for b in remote_branches if (b.remote.name, b.name) not in upstream_names]
         return AllBranches(
             local_branches=local_branches,
             remote_branches=remote_branches,
@@ -146,10 +203,20 @@ class GitFactory:
 
     @classmethod
     def get_all_remote_branches(cls, path: Path, online: bool = False) -> List[RemoteBranch]:
-        branches = []
-        for remote in GitFactory.get_remotes(path):
-            branches += remote.branches(online=online)
-        return sorted(branches)
+        if not online:
+            branches = []
+            for remote, (names, default_branch) in GitOffline.get_all_remote_branches_info(path).items():
+                branches += [RemoteBranch(path, name, remote) for name in names]
+                if default_branch is not None:
+                    branches.append(RemoteBranch(path, default_branch, remote, is_default=True))
+            return sorted(branches, key=attrgetter('remote.name', 'name'))
+        remotes = GitFactory.get_remotes(path)
+        if not remotes:
+            return []
+        with ThreadPoolExecutor(max_workers=min(MAX_JOBS, len(remotes))) as executor:
+            results = executor.map(in_cache_session(lambda r: r.branches(online=online)), remotes)
+            branches = list(chain.from_iterable(results))
+        return sorted(branches, key=attrgetter('remote.name', 'name'))
 
     @classmethod
     def get_remote_branches_offline(cls, path: Path, remote: str) -> List[RemoteBranch]:
@@ -157,7 +224,7 @@ class GitFactory:
         branches = [RemoteBranch(path, branch, remote) for branch in branches]
         if default_branch is not None:
             branches.append(RemoteBranch(path, default_branch, remote, is_default=True))
-        return sorted(branches)
+        return sorted(branches, key=attrgetter('remote.name', 'name'))
 
     @classmethod
     def get_remote_branches_online(cls, path: Path, remote: str,
@@ -167,7 +234,7 @@ class GitFactory:
         else:
             branches = GitOnline.get_remote_branches_info(remote=url)
         branches = [RemoteBranch(path, branch, remote) for branch in branches]
-        return sorted(branches)
+        return sorted(branches, key=attrgetter('remote.name', 'name'))
 
     @classmethod
     def get_remote_tags(cls, path: Path, remote: str, url: Optional[str] = None) -> List[RemoteTag]:
@@ -176,74 +243,115 @@ class GitFactory:
         else:
             tags = GitOnline.get_remote_tags_info(remote=url)
         tags = [RemoteTag(path, tag, remote) for tag in tags]
-        return sorted(tags)
+        return sorted(tags, key=attrgetter('remote.name', 'name'))
 
     @classmethod
     def get_local_branch(cls, path: Path, branch: str) -> Optional[LocalBranch]:
-        branches = GitFactory.get_local_branches(path)
-        branch = [b for b in branches if b.name == branch]
-        return branch[0] if branch else None
+        if not GitFactory.has_local_branch(path, branch):
+            return None
+        return LocalBranch(path, branch)
 
     @classmethod
     def has_local_branch(cls, path: Path, branch: str) -> bool:
-        branch = GitFactory.get_local_branch(path, branch)
-        return branch is not None
+        return branch in GitOffline.get_local_branches_info(path)
+
+    @classmethod
+    def has_local_branches(cls, path: Path, branches: Iterable[str]) -> Set[str]:
+        return set(branches).intersection(GitOffline.get_local_branches_info(path))
 
     @classmethod
     def get_remote_branch_offline(cls, path: Path, branch: str, remote: str) -> Optional[RemoteBranch]:
-        branches = GitFactory.get_remote_branches_offline(path, remote)
-        branch = [b for b in branches if b.name == branch]
-        return branch[0] if branch else None
+        branches, default_branch = GitOffline.get_remote_branches_info(path, remote)
+        if branch in branches:
+            return RemoteBranch(path, branch, remote)
+        if branch == default_branch:
+            return RemoteBranch(path, branch, remote, is_default=True)
+        return None
 
     @classmethod
     def has_remote_branch_offline(cls, path: Path, branch: str, remote: str) -> bool:
-        branch = GitFactory.get_remote_branch_offline(path, branch, remote)
-        return branch is not None
+        branches, default_branch = GitOffline.get_remote_branches_info(path, remote)
+        return branch in branches or branch == default_branch
 
     @classmethod
-    def has_remote_branch_online(cls, path: Path, branch: str, remote: str, url: Optional[str] = None) -> bool:
-        branch = GitFactory.get_remote_branch_online(path, branch, remote=remote, url=url)
-        return branch is not None
+    def has_remote_branches_offline(cls, path: Path, branches: Iterable[str], remote: str) -> Set[str]:
+        existing_branches, default_branch = GitOffline.get_remote_branches_info(path, remote)
+        existing_branches = set(existing_branches)
+        if default_branch is not None:
+            existing_branches.add(default_branch)
+        return existing_branches.intersection(branches)
+
+    @classmethod
+    def has_remote_branch_online(cls, path: Path, branch: str, remote: str, url: Optional[str] = None,
+                                 cache_first: bool = False) -> bool:
+        """Check whether branch exists on remote
+
+        :param Path path: Path to git repo
+        :param str branch: Branch name
+        :param str remote: Remote name
+        :param Optional[str] url: Remote url to query instead of the named remote
+        :param bool cache_first: Answer from local remote-tracking refs when they have the branch, which may be stale
+        :return: True, if branch exists on remote
+        """
+
+        if cache_first and url is None and GitFactory.has_remote_branch_offline(path, branch, remote):
+            return True
+        if url is None:
+            return branch in GitOnline.get_remote_branches_info(path, remote=remote)
+        return branch in GitOnline.get_remote_branches_info(remote=url)
 
     @classmethod
     def get_remote_branch_online(cls, path: Path, branch: str, remote: str,
                                  url: Optional[str] = None) -> Optional[RemoteBranch]:
         branches = GitFactory.get_remote_branches_online(path, remote=remote, url=url)
-        branch = [b for b in branches if b.name == branch]
-        return branch[0] if branch else None
+        return next((b for b in branches if b.name == branch), None)
 
     @classmethod
     def get_tracking_branch(cls, path: Path, branch: str, remote: Optional[str] = None) -> Optional[TrackingBranch]:
-        branches = GitFactory.get_tracking_branches(path)
-        branch = [b for b in branches if b.name == branch]
-        if remote is None:
-            return branch[0] if branch else None
-        branch = [b for b in branch if b.upstream_branch.remote.name == remote]
-        return branch[0] if branch else None
+        info = GitOffline.get_tracking_branches_info(path).get(branch)
+        if info is None:
+            return None
+        tracking_branch = GitFactory._tracking_branch(path, branch, info)
+        if remote is not None and tracking_branch.upstream_branch.remote.name != remote:
+            return None
+        return tracking_branch
 
     @classmethod
     def has_tracking_branch(cls, path: Path, branch: str) -> bool:
-        branch = GitFactory.get_tracking_branch(path, branch)
-        return branch is not None
+        return branch in GitOffline.get_tracking_branches_info(path)
+
+    @classmethod
+    def has_tracking_branches(cls, path: Path, branches: Iterable[str]) -> Set[str]:
+        return set(branches).intersection(GitOffline.get_tracking_branches_info(path))
 
     @classmethod
     def get_local_tag(cls, path: Path, tag: str) -> Optional[LocalTag]:
-        tags = GitFactory.get_local_tags(path)
-        tag = [t for t in tags if t.name == tag]
-        return tag[0] if tag else None
+        if not GitFactory.has_local_tag(path, tag):
+            return None
+        return LocalTag(path, tag)
 
     @classmethod
     def has_local_tag(cls, path: Path, tag: str) -> bool:
-        tag = GitFactory.get_local_tag(path, tag)
-        return tag is not None
+        return tag in GitOffline.get_local_tags_info(path)
+
+    @classmethod
+    def has_local_tags(cls, path: Path, tags: Iterable[str]) -> Set[str]:
+        return set(tags).intersection(GitOffline.get_local_tags_info(path))
 
     @classmethod
     def get_remote_tag(cls, path: Path, tag: str, remote: str, url: Optional[str] = None) -> Optional[RemoteTag]:
-        tags = GitFactory.get_remote_tags(path, remote, url=url)
-        tag = [t for t in tags if t.name == tag]
-        return tag[0] if tag else None
+        if not GitFactory.has_remote_tag(path, tag, remote, url=url):
+            return None
+        return RemoteTag(path, tag, remote)
 
     @classmethod
     def has_remote_tag(cls, path: Path, tag: str, remote: str, url: Optional[str] = None) -> bool:
-        tag = GitFactory.get_remote_tag(path, tag=tag, remote=remote, url=url)
-        return tag is not None
+        if url is None:
+            return tag in GitOnline.get_remote_tags_info(path, remote=remote)
+        return tag in GitOnline.get_remote_tags_info(remote=url)
+
+    @classmethod
+    def has_remote_tags(cls, path: Path, tags: Iterable[str], remote: str, url: Optional[str] = None) -> Set[str]:
+        if url is None:
+            return set(tags).intersection(GitOnline.get_remote_tags_info(path, remote=remote))
+        return set(tags).intersection(GitOnline.get_remote_tags_info(remote=url))
@@ -0,0 +1,22 @@
+"""Lazy git model factory access
+
+.. codeauthor:: Joe DeCapo <joe@polka.cat>
+
+"""
+
+from typing import Type, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .factory import GitFactory
+
+_git_factory = None
+
+
+def git_factory() -> Type['GitFactory']:
+    """GitFactory class, imported on first use since the factory module imports the model modules"""
+
+    global _git_factory
+    if _git_factory is None:
+        from .factory import GitFactory
+        _git_factory = GitFactory
+    return _git_factory
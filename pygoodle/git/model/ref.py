@@ -6,12 +6,16 @@
 
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 from pygoodle.console import CONSOLE
 from pygoodle.git.log import GIT_LOG
 from pygoodle.git.offline import GitOffline
 
+GIT_BRANCH_PREFIX: str = 'refs/heads/'
+GIT_TAG_PREFIX: str = 'refs/tags/'
+GIT_REF_PREFIXES: Tuple[str, ...] = (GIT_BRANCH_PREFIX, GIT_TAG_PREFIX)
+
 
 class Ref:
     """Class encapsulating git ref
@@ -20,6 +24,8 @@ class Ref:
     :ivar str formatted_ref: Formatted ref
     """
 
+    __slots__ = ('path',)
+
     def __init__(self, path: Path):
         """Ref __init__
 
@@ -75,15 +81,10 @@ class Ref:
         :return: Ref with 'refs/heads/' and 'refs/tags/' prefix removed
         """
 
-        git_branch = "refs/heads/"
-        git_tag = "refs/tags/"
-        if ref.startswith(git_branch):
-            length = len(git_branch)
-        elif ref.startswith(git_tag):
-            length = len(git_tag)
-        else:
-            length = 0
-        return ref[length:]
+        if not ref.startswith(GIT_REF_PREFIXES):
+            return ref
+        prefix = GIT_BRANCH_PREFIX if ref.startswith(GIT_BRANCH_PREFIX) else GIT_TAG_PREFIX
+        return ref[len(prefix):]
 
     @staticmethod
     def check_ref_format(ref: str) -> bool:
@@ -103,19 +104,17 @@ class Ref:
         :return: Branch prefixed with 'refs/heads/'
         """
 
-        prefix = "refs/heads/"
-        return branch if branch.startswith(prefix) else f"{prefix}{branch}"
+        return branch if branch.startswith(GIT_BRANCH_PREFIX) else f"{GIT_BRANCH_PREFIX}{branch}"
 
     @staticmethod
     def format_git_tag(tag: str) -> str:
         """Returns properly formatted git tag
 
         :param str tag: Git tag name
-        :return: Tag prefixed with 'refs/heads/'
+        :return: Tag prefixed with 'refs/tags/'
         """
 
-        prefix = "refs/tags/"
-        return tag if tag.startswith(prefix) else f"{prefix}{tag}"
+        return tag if tag.startswith(GIT_TAG_PREFIX) else f"{GIT_TAG_PREFIX}{tag}"
 
     def checkout(self, check: bool = True, track: bool = False) -> None:
         try:
@@ -11,6 +11,7 @@ from pygoodle.console import CONSOLE
 from pygoodle.format import Format
 # from pygoodle.git.decorators import error_msg
 from pygoodle.git.log import GIT_LOG
+from pygoodle.git.model.lazy_factory import git_factory
 from pygoodle.git.offline import GitOffline
 from pygoodle.git.online import GitOnline
 
@@ -26,6 +27,8 @@ class Remote:
     :ivar str push_url: Push url
     """
 
+    __slots__ = ('name', 'path')
+
     def __init__(self, path: Path, name: str):
         """GitRemote __init__
 
@@ -53,10 +56,9 @@ class Remote:
         return GitOffline.get_remote_push_url(self.path, self.name)
 
     def branches(self, url: Optional[str] = None, online: bool = False) -> List[RemoteBranch]:
-        from pygoodle.git.model.factory import GitFactory
         if online or url is not None:
-            return GitFactory.get_remote_branches_online(self.path, remote=self.name, url=url)
-        return GitFactory.get_remote_branches_offline(self.path, self.name)
+            return git_factory().get_remote_branches_online(self.path, remote=self.name, url=url)
+        return git_factory().get_remote_branches_offline(self.path, self.name)
 
     # @error_msg('Failed to create remote')
     def create(self, url: str, fetch: bool = False, tags: bool = False) -> None:
@@ -68,8 +70,7 @@ class Remote:
 
     @property
     def exists(self) -> bool:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.has_remote(self.path, remote=self.name)
+        return self.name in GitOffline.get_remotes_info(self.path)
 
     def default_branch(self, url: str) -> Optional[RemoteBranch]:
         if GitOffline.is_repo_cloned(self.path):
@@ -79,7 +80,7 @@ class Remote:
         default_branch = GitOnline.get_default_branch(url)
         if default_branch is None:
             return None
-        git_dir = GitOffline.git_dir(self.path)
+        git_dir = GitOffline.git_common_dir(self.path)
         if git_dir is not None and git_dir.is_dir():
             GitOffline.save_default_branch(git_dir, self.name, default_branch)
         return RemoteBranch(self.path, default_branch, self.name)
@@ -94,10 +95,7 @@ class Remote:
               depth: Optional[int] = None, branch: Optional[str] = None, unshallow: bool = False,
               jobs: Optional[int] = None, fetch_all: bool = False, check: bool = True,
               print_output: bool = True) -> None:
-        output = self.name
-        if branch is not None:
-            branch = branch
-            output = f'{output} {branch}'
+        output = self.name if branch is None else f'{self.name} {branch}'
         CONSOLE.stdout(f'Fetch from {output}')
         try:
             GitOnline.fetch(self.path, remote=self.name, prune=prune, prune_tags=prune_tags, tags=tags, depth=depth,
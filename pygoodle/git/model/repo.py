@@ -4,15 +4,18 @@
 
 """
 
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Union, TYPE_CHECKING
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar, Union, TYPE_CHECKING
 
 from pygoodle.console import CONSOLE
 # from pygoodle.git.decorators import not_detached
 from pygoodle.format import Format
+from pygoodle.git.cache import cache_generation, cache_session
 from pygoodle.git.constants import GitConfig, HEAD, ORIGIN
 from pygoodle.git.decorators import error_msg
 from pygoodle.git.log import GIT_LOG
+from pygoodle.git.model.lazy_factory import git_factory
 from pygoodle.git.offline import GitOffline
 from pygoodle.git.online import GitOnline
 
@@ -30,6 +33,8 @@ if TYPE_CHECKING:
     from .submodule import Submodule
     from .factory import AllBranches
 
+T = TypeVar('T')
+
 
 class Repo:
     """Class encapsulating base git utilities
@@ -38,6 +43,8 @@ class Repo:
     :ivar Remote default_remote: Default remote
     """
 
+    __slots__ = ('path', 'default_remote', 'url', 'protocol', '_cache', '_cache_generation', '_snapshots')
+
     def __init__(self, path: Path, default_remote: Optional[str] = None, url: Optional[str] = None,
                  protocol: Protocol = Protocol.SSH):
         """LocalRepo __init__
@@ -52,16 +59,67 @@ class Repo:
         self.default_remote: Remote = Remote(self.path, default_remote)
         self.url: Optional[str] = url
         self.protocol: Protocol = protocol
+        self._cache: Dict[str, Any] = {}
+        self._cache_generation: int = cache_generation()
+        self._snapshots: int = 0
+
+    @contextmanager
+    def _snapshot(self) -> Iterator[None]:
+        """Share repo state between the queries of a composite method, discarded after so later calls see changes"""
+
+        self._snapshots += 1
+        try:
+            with cache_session():
+                yield
+        finally:
+            self._snapshots -= 1
+            if not self._snapshots:
+                self._cache.clear()
+
+    def _memoize(self, key: str, func: Callable[[], T]) -> T:
+        """Memoize value within a snapshot, until a git command modifies a repo or it's invalidated
+
+        :param str key: Cache key
+        :param Callable[[], T] func: Function computing value
+        :return: Memoized value
+        """
+
+        if not self._snapshots:
+            return func()
+        generation = cache_generation()
+        if self._cache_generation != generation:
+            self._cache.clear()
+            self._cache_generation = generation
+        if key not in self._cache:
+            self._cache[key] = func()
+        return self._cache[key]
+
+    def invalidate(self, *keys: str) -> None:
+        """Discard memoized values, e.g. after files are modified without using git
+
+        :param str keys: Keys to discard, all values are discarded if none are given
+        """
+
+        if not keys:
+            self._cache.clear()
+            return
+        for key in keys:
+            self._cache.pop(key, None)
+
+    @property
+    def _status_info(self) -> Dict[str, Union[Optional[str], int, bool]]:
+        return self._memoize('status', lambda: GitOffline.get_status_info(self.path))
 
     @property
     def git_dir(self) -> Optional[Path]:
-        return GitOffline.git_dir(self.path)
+        return GitOffline.git_common_dir(self.path)
 
     @error_msg('Failed to clone repo')
     def clone(self, path: Path, url: str, depth: Optional[int] = None, branch: Optional[str] = None,
-              jobs: Optional[int] = None, origin: Optional[str] = None) -> 'Repo':
+              jobs: Optional[int] = None, origin: Optional[str] = None, recurse_submodules: bool = False) -> 'Repo':
         CONSOLE.stdout(' - Clone repo')
-        GitOnline.clone(path, url=url, depth=depth, branch=branch, jobs=jobs, origin=origin)
+        GitOnline.clone(path, url=url, depth=depth, branch=branch, jobs=jobs, origin=origin,
+                        recurse_submodules=recurse_submodules)
         return Repo(path)
 
     @property
@@ -70,51 +128,45 @@ class Repo:
 
     @property
     def has_untracked_files(self) -> bool:
-        return GitOffline.has_untracked_files(self.path)
+        return self._status_info['untracked']
 
     @property
     def is_dirty(self) -> bool:
-        return GitOffline.is_dirty(self.path)
+        return self._status_info['dirty']
 
     @property
     def is_detached(self) -> bool:
-        return GitOffline.is_detached(self.path)
+        branch, _ = GitOffline.read_head(self.path)
+        return branch is None
 
     @property
     def is_shallow(self) -> bool:
-        return GitOffline.is_shallow_repo(self.path)
+        return self._memoize('is_shallow', lambda: GitOffline.is_shallow_repo(self.path))
 
     @property
     def is_rebase_in_progress(self) -> bool:
         return GitOffline.is_rebase_in_progress(self.path)
 
     def get_remotes(self) -> List[Remote]:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_remotes(self.path)
+        return git_factory().get_remotes(self.path)
 
     def get_submodules(self) -> List['Submodule']:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_submodules(self.path)
+        return git_factory().get_submodules(self.path)
 
     def get_tracking_branches(self) -> List[TrackingBranch]:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_tracking_branches(self.path)
+        return git_factory().get_tracking_branches(self.path)
 
     def get_local_branches(self) -> List[LocalBranch]:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_local_branches(self.path)
+        return git_factory().get_local_branches(self.path)
 
     def get_remote_branches(self, online: bool = False) -> List[RemoteBranch]:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_all_remote_branches(self.path, online=online)
+        return git_factory().get_all_remote_branches(self.path, online=online)
 
     def get_all_branches(self, online: bool = False) -> 'AllBranches':
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_all_branches(self.path, online=online)
+        return git_factory().get_all_branches(self.path, online=online)
 
     def has_local_branch(self, branch: str) -> bool:
-        local_branch = self.get_local_branch(branch)
-        return local_branch is not None
+        return git_factory().has_local_branch(self.path, branch)
 
     def has_remote_branch(self, branch: str, remote: Optional[str] = None,
                           url: Optional[str] = None, online: bool = False) -> bool:
@@ -122,6 +174,8 @@ class Repo:
         return remote_branch is not None
 
     def has_tracking_branch(self, branch: str, remote: Optional[str] = None) -> bool:
+        if remote is None:
+            return git_factory().has_tracking_branch(self.path, branch)
         tracking_branch = self.get_tracking_branch(branch, remote=remote)
         return tracking_branch is not None
 
@@ -130,32 +184,26 @@ class Repo:
         return submodule is not None
 
     def get_submodule(self, submodule_path: Path) -> Optional['Submodule']:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_submodule(self.path, submodule_path)
+        return git_factory().get_submodule(self.path, submodule_path)
 
     def get_local_branch(self, branch: str) -> Optional[LocalBranch]:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_local_branch(self.path, branch)
+        return git_factory().get_local_branch(self.path, branch)
 
     def get_remote_branch(self, branch: str, remote: Optional[str] = None,
                           url: Optional[str] = None, online: bool = False) -> Optional[RemoteBranch]:
         remote = ORIGIN if remote is None else remote
-        from pygoodle.git.model.factory import GitFactory
         if online or url is not None:
-            return GitFactory.get_remote_branch_online(self.path, branch=branch, remote=remote, url=url)
-        return GitFactory.get_remote_branch_offline(self.path, branch=branch, remote=remote)
+            return git_factory().get_remote_branch_online(self.path, branch=branch, remote=remote, url=url)
+        return git_factory().get_remote_branch_offline(self.path, branch=branch, remote=remote)
 
     def get_local_tags(self) -> List[LocalTag]:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_local_tags(self.path)
+        return git_factory().get_local_tags(self.path)
 
     def get_local_tag(self, tag: str) -> Optional[LocalTag]:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_local_tag(self.path, tag)
+        return git_factory().get_local_tag(self.path, tag)
 
     def has_local_tag(self, tag: str) -> bool:
-        local_tag = self.get_local_tag(tag)
-        return local_tag is not None
+        return git_factory().has_local_tag(self.path, tag)
 
     def has_remote_tag(self, tag: str, remote: Optional[str] = None,
                        url: Optional[str] = None) -> bool:
@@ -165,26 +213,16 @@ class Repo:
     def get_remote_tag(self, tag: str, remote: Optional[str] = None,
                        url: Optional[str] = None) -> Optional[RemoteTag]:
         remote = ORIGIN if remote is None else remote
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_remote_tag(self.path, tag, remote, url=url)
+        return git_factory().get_remote_tag(self.path, tag, remote, url=url)
 
     def get_remote_tags(self, remote: Optional[str] = None,
                         url: Optional[str] = None) -> List[RemoteTag]:
         remote = ORIGIN if remote is None else remote
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_remote_tags(self.path, remote, url=url)
+        return git_factory().get_remote_tags(self.path, remote, url=url)
 
     def get_remote(self, remote: Optional[str] = None, fetch_url: Optional[str] = None,
                    push_url: Optional[str] = None) -> Optional[Remote]:
-        from pygoodle.git.model.factory import GitFactory
-        remotes = GitFactory.get_remotes(self.path)
-        if remote is not None:
-            remotes = [r for r in remotes if r.name == remote]
-        if fetch_url is not None:
-            remotes = [r for r in remotes if r.fetch_url == fetch_url]
-        if push_url is not None:
-            remotes = [r for r in remotes if r.push_url == push_url]
-        return remotes[0] if remotes else None
+        return git_factory().get_remote(self.path, remote=remote, fetch_url=fetch_url, push_url=push_url)
 
     def has_remote(self, remote: Optional[str] = None, fetch_url: Optional[str] = None,
                    push_url: Optional[str] = None) -> bool:
@@ -192,12 +230,10 @@ class Repo:
         return remote is not None
 
     def get_tracking_branch(self, branch: str, remote: Optional[str] = None) -> Optional[TrackingBranch]:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_tracking_branch(self.path, branch, remote=remote)
+        return git_factory().get_tracking_branch(self.path, branch, remote=remote)
 
     def get_diff(self) -> 'Diff':
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_diff(self.path)
+        return git_factory().get_diff(self.path)
 
     @property
     def exists(self) -> bool:
@@ -217,28 +253,29 @@ class Repo:
         :return: True, if repo not dirty or doesn't exist on disk
         """
 
+        with self._snapshot():
+            return self._is_valid(allow_missing)
+
+    def _is_valid(self, allow_missing: bool) -> bool:
         if not self.exists:
             return allow_missing
 
         if self.is_dirty or self.is_rebase_in_progress or self.has_untracked_files:
             return False
 
-        submodules = self.get_submodules()
-        if not submodules:
-            return True
-        return all([s.is_valid(allow_missing=allow_missing) for s in submodules])
+        return all(s.is_valid(allow_missing=allow_missing) for s in self.get_submodules())
 
     def remote(self, name: str) -> Optional[Remote]:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.get_remote(self.path, name)
+        return git_factory().get_remote(self.path, name)
 
     @property
     def current_timestamp(self) -> str:
-        return GitOffline.current_timestamp(self.path)
+        return self._memoize('current_timestamp', lambda: GitOffline.current_timestamp(self.path))
 
     @property
     def current_branch(self) -> str:
-        return GitOffline.current_branch(self.path)
+        branch, _ = GitOffline.read_head(self.path)
+        return HEAD if branch is None else branch
 
     def sha(self, ref: Optional[str] = None, short: bool = False) -> str:
         if ref is None:
@@ -318,9 +355,7 @@ class Repo:
         """
 
         CONSOLE.stdout(" - Update local git config")
-        for key, value in config.items():
-            GitOffline.git_config_unset_all_local(self.path, key)
-            GitOffline.git_config_add_local(self.path, key, value)
+        GitOffline.git_config_replace_all_local(self.path, config)
 
     @error_msg('Failed to update git lfs hooks')
     def install_lfs_hooks(self, local: bool = False) -> None:
@@ -373,11 +408,12 @@ class Repo:
     def print_local_branches(self) -> None:
         """Print local git branches"""
 
-        for branch in self.get_local_branches():
-            if branch.name == self.current_branch:
-                CONSOLE.stdout(f'* {Format.green(branch.name)}')
+        current_branch = self.current_branch
+        for branch in GitOffline.get_local_branches_info(self.path):
+            if branch == current_branch:
+                CONSOLE.stdout(f'* {Format.green(branch)}')
             else:
-                CONSOLE.stdout(branch)
+                CONSOLE.stdout(f'  {branch}')
 
     def print_validation(self, allow_missing: bool = False) -> None:
         """Print validation message"""
@@ -389,25 +425,30 @@ class Repo:
 
     def groom(self, untracked_directories: bool = True, force: bool = True,
               ignored: bool = False, untracked_files: bool = True) -> None:
-        self.clean(untracked_directories=untracked_directories,
-                   force=force, ignored=ignored, untracked_files=untracked_files)
-        self.reset(hard=True)
-        if self.is_rebase_in_progress:
-            self.abort_rebase()
+        with self._snapshot():
+            is_dirty = self.is_dirty
+            has_untracked_files = self.has_untracked_files
+        if ignored or untracked_files or has_untracked_files:
+            self.clean(untracked_directories=untracked_directories,
+                       force=force, ignored=ignored, untracked_files=untracked_files)
+        if is_dirty:
+            self.reset(hard=True)
+        self.abort_rebase()
 
     @property
     def formatted_ref(self) -> str:
         """Formatted project repo ref"""
 
-        if self.is_detached:
-            return Format.Git.ref(Format.escape(f'[HEAD @ {self.sha()}]'))
+        status = GitOffline.get_status_info(self.path)
+        if status['branch'] == HEAD:
+            return Format.Git.ref(Format.escape(f'[HEAD @ {status["sha"]}]'))
 
-        current_branch_output = Format.Git.ref(Format.escape(f'[{self.current_branch}]'))
+        current_branch_output = Format.Git.ref(Format.escape(f'[{status["branch"]}]'))
 
-        local_commits_count = GitOffline.new_commits_count(self.path)
+        local_commits_count = status['ahead']
         no_local_commits = local_commits_count == 0
         # TODO: Specify correct remote
-        upstream_commits_count = GitOffline.new_commits_count(self.path, upstream=True)
+        upstream_commits_count = status['behind']
         no_upstream_commits = upstream_commits_count == 0
 
         if no_local_commits and no_upstream_commits:
@@ -5,7 +5,7 @@
 """
 
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, List, Optional
 
 # from pygoodle.git.constants import ORIGIN
 from pygoodle.git.offline import GitOffline
@@ -21,6 +21,8 @@ class Submodule(Repo):
     :ivar Path submodule_path: Relative path to submodule
     """
 
+    __slots__ = ('repo_path', 'submodule_path', '_url', '_commit', '_branch', '_active')
+
     def __init__(self, repo_path: Path, submodule_path: Path, url: Optional[str] = None, commit: Optional[str] = None,
                  branch: Optional[str] = None, active: Optional[bool] = None):
         """LocalRepo __init__
@@ -86,3 +88,45 @@ class Submodule(Repo):
         GitOnline.submodule_update(self.repo_path, init=init, depth=depth, single_branch=single_branch, jobs=jobs,
                                    recursive=recursive, checkout=checkout, merge=merge, rebase=rebase,
                                    paths=[self.submodule_path])
+
+    @staticmethod
+    def batch_absorbgitdirs(submodules: Iterable['Submodule']) -> None:
+        for repo_path, paths in Submodule._paths_by_repo(submodules).items():
+            GitOffline.submodule_absorbgitdirs(repo_path, paths=paths)
+
+    @staticmethod
+    def batch_deinit(submodules: Iterable['Submodule'], force: bool = False) -> None:
+        for repo_path, paths in Submodule._paths_by_repo(submodules).items():
+            GitOffline.submodule_deinit(repo_path, force=force, paths=paths)
+
+    @staticmethod
+    def batch_init(submodules: Iterable['Submodule']) -> None:
+        for repo_path, paths in Submodule._paths_by_repo(submodules).items():
+            GitOffline.submodule_init(repo_path, paths=paths)
+
+    @staticmethod
+    def batch_sync(submodules: Iterable['Submodule'], recursive: bool = False) -> None:
+        for repo_path, paths in Submodule._paths_by_repo(submodules).items():
+            GitOffline.submodule_sync(repo_path, recursive=recursive, paths=paths)
+
+    @staticmethod
+    def batch_update(submodules: Iterable['Submodule'], init: bool = False, depth: Optional[int] = None,
+                     single_branch: bool = False, jobs: Optional[int] = None, recursive: bool = False,
+                     checkout: bool = False, rebase: bool = False, merge: bool = False) -> None:
+        for repo_path, paths in Submodule._paths_by_repo(submodules).items():
+            GitOnline.submodule_update(repo_path, init=init, depth=depth, single_branch=single_branch, jobs=jobs,
+                                       recursive=recursive, checkout=checkout, merge=merge, rebase=rebase,
+                                       paths=paths)
+
+    @staticmethod
+    def _paths_by_repo(submodules: Iterable['Submodule']) -> Dict[Path, List[Path]]:
+        """Group submodule paths by parent repo, so each repo gets a single git submodule call
+
+        :param Iterable[Submodule] submodules: Submodules to group
+        :return: Submodule paths keyed by parent repo path, in the order first seen
+        """
+
+        paths_by_repo = {}
+        for submodule in submodules:
+            paths_by_repo.setdefault(submodule.repo_path, []).append(submodule.submodule_path)
+        return paths_by_repo
@@ -4,9 +4,13 @@
 
 """
 
+from pathlib import Path
+from typing import Dict, Iterable, List
+
 from pygoodle.console import CONSOLE
 from pygoodle.format import Format
 # from pygoodle.git.decorators import error_msg
+from pygoodle.git.model.lazy_factory import git_factory
 from pygoodle.git.offline import GitOffline
 
 from .tag import Tag
@@ -19,6 +23,8 @@ class LocalTag(Tag):
     :ivar str formatted_ref: Formatted ref
     """
 
+    __slots__ = ()
+
     @property
     def is_checked_out(self) -> bool:
         current_sha = GitOffline.current_head_commit_sha(self.path)
@@ -44,7 +50,33 @@ class LocalTag(Tag):
         CONSOLE.stdout(f' - Delete local tag {Format.Git.ref(self.short_ref)}')
         GitOffline.delete_local_tag(self.path, name=self.name)
 
+    @staticmethod
+    def batch_delete(tags: Iterable['LocalTag']) -> None:
+        for path, names in LocalTag._names_by_repo(tags).items():
+            existing = git_factory().has_local_tags(path, names)
+            for name in names:
+                if name not in existing:
+                    CONSOLE.stdout(f" - Local tag {Format.Git.ref(name)} doesn't exist")
+            names = [name for name in names if name in existing]
+            if not names:
+                continue
+            CONSOLE.stdout(f" - Delete local tags {', '.join(Format.Git.ref(name) for name in names)}")
+            GitOffline.delete_local_tags(path, names=names)
+
+    @staticmethod
+    def _names_by_repo(tags: Iterable['LocalTag']) -> Dict[Path, List[str]]:
+        """Group tag names by repo, so each repo gets a single git tag call
+
+        :param Iterable[LocalTag] tags: Tags to group
+        :return: Tag names keyed by repo path, in the order first seen
+        """
+
+        names_by_repo = {}
+        for tag in tags:
+            # Dict keys keep first seen order while dropping duplicates
+            names_by_repo.setdefault(tag.path, {})[tag.name] = None
+        return {path: list(names) for path, names in names_by_repo.items()}
+
     @property
     def exists(self) -> bool:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.has_local_tag(self.path, self.name)
+        return git_factory().has_local_tag(self.path, self.name)
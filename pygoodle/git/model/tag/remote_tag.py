@@ -5,7 +5,7 @@
 """
 
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from pygoodle.console import CONSOLE
 from pygoodle.format import Format
@@ -13,6 +13,7 @@ from pygoodle.git.constants import ORIGIN
 # from pygoodle.git.decorators import error_msg
 from pygoodle.git.offline import GitOffline
 from pygoodle.git.online import GitOnline
+from pygoodle.git.model.lazy_factory import git_factory
 from pygoodle.git.model.remote import Remote
 
 from .tag import Tag
@@ -26,6 +27,8 @@ class RemoteTag(Tag):
     :ivar str formatted_ref: Formatted ref
     """
 
+    __slots__ = ('remote',)
+
     def __init__(self, path: Path, name: str, remote: Optional[str] = None):
         """GitRepo __init__
 
@@ -36,19 +39,15 @@ class RemoteTag(Tag):
         remote = ORIGIN if remote is None else remote
         super().__init__(path, name)
         self.remote: Remote = Remote(self.path, remote)
-
-    def __eq__(self, other) -> bool:
-        if isinstance(other, RemoteTag):
-            return super().__eq__(other) and self.remote.name == other.remote.name
-        return False
+        self._key = (str(path), name, remote)
 
     def __lt__(self, other: 'RemoteTag') -> bool:
-        return f'{self.remote.name}/{self.name}' < f'{other.remote.name}/{other.name}'
+        return (self.remote.name, self.name) < (other.remote.name, other.name)
 
     @property
     def is_checked_out(self) -> bool:
         current_sha = GitOffline.current_head_commit_sha(self.path)
-        tag_sha = GitOnline.get_remote_tag_sha(self.path, self.name)
+        tag_sha = GitOnline.get_remote_tag_sha(self.path, self.name, self.remote.name)
         return current_sha == tag_sha
 
     @property
@@ -70,11 +69,36 @@ class RemoteTag(Tag):
         CONSOLE.stdout(f' - Delete remote tag {Format.Git.ref(self.short_ref)}')
         GitOnline.delete_remote_tag(self.path, tag=self.name, remote=self.remote.name, force=True)
 
+    @staticmethod
+    def batch_delete(tags: Iterable['RemoteTag']) -> None:
+        for (path, remote), names in RemoteTag._names_by_remote(tags).items():
+            existing = git_factory().has_remote_tags(path, names, remote)
+            for name in names:
+                if name not in existing:
+                    CONSOLE.stdout(f" - Remote tag {Format.Git.ref(name)} doesn't exist")
+            names = [name for name in names if name in existing]
+            if not names:
+                continue
+            CONSOLE.stdout(f" - Delete remote tags {', '.join(Format.Git.ref(name) for name in names)}")
+            GitOnline.delete_remote_tags(path, tags=names, remote=remote, force=True)
+
+    @staticmethod
+    def _names_by_remote(tags: Iterable['RemoteTag']) -> Dict[Tuple[Path, str], List[str]]:
+        """Group tag names by repo and remote, so each remote gets a single git push
+
+        :param Iterable[RemoteTag] tags: Tags to group
+        :return: Tag names keyed by repo path and remote name, in the order first seen
+        """
+
+        names_by_remote = {}
+        for tag in tags:
+            # Dict keys keep first seen order while dropping duplicates
+            names_by_remote.setdefault((tag.path, tag.remote.name), {})[tag.name] = None
+        return {key: list(names) for key, names in names_by_remote.items()}
+
     @property
     def exists(self) -> bool:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.has_remote_tag(self.path, self.name, self.remote.name)
+        return git_factory().has_remote_tag(self.path, self.name, self.remote.name)
 
     def exists_online(self, url: str) -> bool:
-        from pygoodle.git.model.factory import GitFactory
-        return GitFactory.has_remote_tag(self.path, tag=self.name, remote=self.remote.name, url=url)
+        return git_factory().has_remote_tag(self.path, tag=self.name, remote=self.remote.name, url=url)
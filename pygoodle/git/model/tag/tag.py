@@ -4,10 +4,14 @@
 
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from pygoodle.console import CONSOLE
-from pygoodle.git.model.ref import Ref
+from pygoodle.git.cache import cache_session, in_cache_session
+from pygoodle.git.constants import MAX_JOBS
+from pygoodle.git.model.ref import GIT_REF_PREFIXES, GIT_TAG_PREFIX, Ref
 from pygoodle.git.offline import GitOffline
 
 
@@ -19,6 +23,8 @@ class Tag(Ref):
     :ivar str formatted_ref: Formatted ref
     """
 
+    __slots__ = ('name', '_short_ref', '_formatted_ref', '_key')
+
     def __init__(self, path: Path, name: str):
         """GitRepo __init__
 
@@ -28,13 +34,24 @@ class Tag(Ref):
 
         super().__init__(path)
         self.name: str = name
-        self.check_ref_format(self.formatted_ref)
+        if name.startswith(GIT_REF_PREFIXES):
+            self._short_ref: str = self.truncate_ref(name)
+            self._formatted_ref: str = self.format_git_tag(name)
+        else:
+            # Plain tag names are the common case, so skip the generic prefix handling
+            self._short_ref = name
+            self._formatted_ref = GIT_TAG_PREFIX + name
+        # Precomputed identity for cheap equality and hashing
+        self._key: Tuple[str, ...] = (str(path), name)
 
     def __eq__(self, other) -> bool:
         if isinstance(other, Tag):
-            return self.name == other.name and self.path == other.path
+            return self._key == other._key
         return False
 
+    def __hash__(self) -> int:
+        return hash(self._key)
+
     def __lt__(self, other: 'Tag') -> bool:
         return self.name < other.name
 
@@ -55,13 +72,40 @@ class Tag(Ref):
     def short_ref(self) -> str:
         """Short git ref"""
 
-        return self.truncate_ref(self.name)
+        return self._short_ref
 
     @property
     def formatted_ref(self) -> str:
         """Formatted git ref"""
 
-        return self.format_git_tag(self.name)
+        return self._formatted_ref
+
+    @staticmethod
+    def resolve_shas(tags: Iterable['Tag'], max_workers: int = MAX_JOBS) -> List[Optional[str]]:
+        """Commit shas of tags, in the same order as given
+
+        Tags in the same repo and remote share one cached tag listing, so each group is resolved on its own thread
+
+        :param Iterable[Tag] tags: Tags to resolve
+        :param int max_workers: Maximum number of groups resolved in parallel
+        :return: Commit sha of each tag
+        """
+
+        tags = list(tags)
+        shas: List[Optional[str]] = [None] * len(tags)
+        groups: Dict[Tuple[Path, Optional[str]], List[int]] = {}
+        for index, tag in enumerate(tags):
+            remote = getattr(tag, 'remote', None)
+            groups.setdefault((tag.path, None if remote is None else remote.name), []).append(index)
+
+        def resolve(indices: List[int]) -> None:
+            for i in indices:
+                shas[i] = tags[i].sha
+
+        if groups:
+            with cache_session(), ThreadPoolExecutor(max_workers=min(max_workers, len(groups))) as executor:
+                list(executor.map(in_cache_session(resolve), groups.values()))
+        return shas
 
     def checkout(self, check: bool = True, track: bool = False) -> None:
         current_commit = GitOffline.current_head_commit_sha(self.path)
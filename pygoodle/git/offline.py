@@ -1,16 +1,24 @@
 """Misc git utils"""
 
+import os
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
+from string import hexdigits
 from subprocess import CalledProcessError, CompletedProcess
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import pygoodle.command as cmd
 import pygoodle.filesystem as fs
 from pygoodle.format import Format
 
-from .constants import HEAD, FETCH_URL, PUSH_URL
-from .process_output import ProcessOutput
+from .cache import cached, invalidate_cache, invalidates_cache, skip_caching
+from .constants import GitConfig, HEAD, FETCH_URL, PUSH_URL
+from .daemon import GitDaemon
+from .process_output import ProcessOutput, RefInfo
+
+HEAD_BRANCH_PREFIX: str = 'ref: refs/heads/'
 
 
 class GitOffline:
@@ -18,20 +26,21 @@ class GitOffline:
     @classmethod
     def get_remote_fetch_url(cls, path: Path, remote: str) -> Optional[str]:
         remotes = GitOffline.get_remotes_info(path)
-        if remote not in remotes.keys():
+        if remote not in remotes:
             return None
         return remotes[remote][FETCH_URL]
 
     @classmethod
     def get_remote_push_url(cls, path: Path, remote: str) -> Optional[str]:
         remotes = GitOffline.get_remotes_info(path)
-        if remote not in remotes.keys():
+        if remote not in remotes:
             return None
         return remotes[remote][PUSH_URL]
 
     @classmethod
+    @cached
     def get_remotes_info(cls, path: Path) -> Dict[str, Dict[str, str]]:
-        output = cmd.get_stdout('git remote -v', cwd=path)
+        output = cmd.get_stdout(['git', 'remote', '-v'], cwd=path, shell=False)
         if output is None:
             return {}
         remotes = ProcessOutput.remotes(output)
@@ -46,16 +55,17 @@ class GitOffline:
         :return: URL of remote
         """
 
-        return cmd.get_stdout(f'git remote get-url {remote_name}', cwd=path)
+        return cmd.get_stdout(['git', 'remote', 'get-url', remote_name], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def create_remote(cls, path: Path, name: str, url: str, fetch: bool = False, tags: bool = False) -> None:
-        args = ''
+        args = []
         if fetch:
-            args += ' -f '
+            args.append('-f')
         if tags:
-            args += ' --tags '
-        cmd.run_silent(f'git remote add {name} {url}', cwd=path)
+            args.append('--tags')
+        cmd.run_silent(['git', 'remote', 'add', *args, name, url], cwd=path, shell=False)
 
     @classmethod
     def find_rev_by_timestamp(cls, path: Path, timestamp: str, ref: str, author: Optional[str] = None) -> Optional[str]:
@@ -68,58 +78,59 @@ class GitOffline:
         :return: Commit sha at or before timestamp
         """
 
-        args = ''
+        args = []
         if author is not None:
-            args += f' --author {author} '
-        return cmd.get_stdout(f'git log -1 --format=%H --before={timestamp} {ref}', cwd=path)
+            args += ['--author', author]
+        # rev-list prints shas directly, without log's pretty format machinery
+        return cmd.get_stdout(['git', 'rev-list', '-1', f'--before={timestamp}', *args, ref], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def install_lfs_hooks(cls, path: Path, local: bool = False) -> CompletedProcess:
         """Install git lfs hooks"""
 
-        args = ''
-        if local:
-            args = ' --local '
-        return cmd.run(f'git lfs install {args}', cwd=path)
+        args = ['--local'] if local else []
+        return cmd.run(['git', 'lfs', 'install', *args], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def rename_remote(cls, path: Path, old_name: str, new_name: str) -> CompletedProcess:
-        return cmd.run(f'git remote rename {old_name} {new_name}', cwd=path)
+        return cmd.run(['git', 'remote', 'rename', old_name, new_name], cwd=path, shell=False)
 
     @classmethod
+    @cached
     def get_default_branch(cls, path: Path, remote: str) -> Optional[str]:
         """Get default branch from local repo"""
 
-        try:
-            command = f'git symbolic-ref refs/remotes/{remote}/{HEAD}'
-            output = cmd.get_stdout(command, cwd=path)
-            if output is None:
-                return None
-            output_list = output.split()
-            branch = [Format.remove_prefix(chunk, f'refs/remotes/{remote}/') for chunk in output_list
-                      if chunk.startswith(f'refs/remotes/{remote}/')]
-            return branch[0]
-        except CalledProcessError:
+        prefix = f'refs/remotes/{remote}/'
+        output = cmd.get_stdout(['git', 'symbolic-ref', f'{prefix}{HEAD}'], cwd=path, shell=False)
+        if output is None or not output.startswith(prefix):
             return None
+        return output[len(prefix):]
 
     @classmethod
+    @invalidates_cache
     def save_default_branch(cls, git_dir: Path, remote: str, branch: str) -> None:
         """Save default branch"""
 
-        if not git_dir.exists():
+        if not git_dir.is_dir():
             return
         remote_head_ref = git_dir / 'refs' / 'remotes' / remote / HEAD
-        if not remote_head_ref.exists():
-            fs.make_dir(remote_head_ref.parent, exist_ok=True)
-            contents = f'ref: refs/remotes/{remote}/{branch}'
-            remote_head_ref.touch()
-            remote_head_ref.write_text(contents)
+        if remote_head_ref.exists():
+            return
+        fs.make_dir(remote_head_ref.parent, exist_ok=True)
+        remote_head_ref.write_text(f'ref: refs/remotes/{remote}/{branch}\n')
 
     @classmethod
     def current_timestamp(cls, path: Path) -> Optional[str]:
         """Current timestamp of HEAD commit"""
 
-        return cmd.get_stdout('git log -1 --format=%cI', cwd=path)
+        commit = GitDaemon.read_object(path, f'{HEAD}^{{commit}}')
+        if commit is not None:
+            timestamp = ProcessOutput.commit_timestamp(commit[1])
+            if timestamp is not None:
+                return timestamp
+        return cmd.get_stdout(['git', 'log', '-1', '--format=%cI'], cwd=path, shell=False)
 
     @classmethod
     def is_repo_cloned(cls, path: Path) -> bool:
@@ -132,7 +143,12 @@ class GitOffline:
         git_dir = GitOffline.git_dir(path)
         if git_dir is None:
             return False
-        return git_dir.is_dir() and fs.has_contents(git_dir)
+        try:
+            # A single directory read covers both the existence and contents checks
+            with os.scandir(git_dir) as entries:
+                return next(entries, None) is not None
+        except OSError:
+            return False
 
     @classmethod
     def is_dirty(cls, path: Path) -> bool:
@@ -142,14 +158,14 @@ class GitOffline:
 
     @classmethod
     def diff_index(cls, path: Path, treeish: str = HEAD) -> Optional[str]:
-        return cmd.get_stdout(f'git diff-index {treeish}', cwd=path)
+        return cmd.get_stdout(['git', 'diff-index', treeish], cwd=path, shell=False)
 
     @classmethod
     def update_index(cls, path: Path, refresh: bool = False) -> CompletedProcess:
-        args = ''
+        args = []
         if refresh:
-            args += ' --refresh '
-        return cmd.run_silent(f'git update-index {args}', path)
+            args.append('--refresh')
+        return cmd.run_silent(['git', 'update-index', *args], path, shell=False)
 
     @classmethod
     def get_diff_index_info(cls, path: Path) -> Dict[str, List[Dict[str, str]]]:
@@ -159,33 +175,51 @@ class GitOffline:
 
     @classmethod
     def is_rebase_in_progress(cls, path: Path) -> bool:
-        rebase_merge = path / ".git" / "rebase-merge"
-        rebase_apply = path / ".git" / "rebase-apply"
-        rebase_merge_exists = rebase_merge.exists() and rebase_merge.is_dir()
-        rebase_apply_exists = rebase_apply.exists() and rebase_apply.is_dir()
-        return rebase_merge_exists or rebase_apply_exists
+        git_dir = GitOffline.git_dir(path)
+        if git_dir is None:
+            return False
+        # is_dir() is False for missing paths, so each directory costs a single stat
+        return (git_dir / "rebase-merge").is_dir() or (git_dir / "rebase-apply").is_dir()
 
     @classmethod
-    def get_local_branches_info(cls, path: Path) -> List[str]:
-        output = cmd.get_stdout("git branch", cwd=path)
-        if output is None:
+    @cached
+    def get_local_branches_info(cls, path: Path) -> Dict[str, str]:
+        """Commit sha of every local branch keyed by name, so membership checks are dict lookups"""
+
+        refs = GitOffline.get_refs_info(path)
+        prefix = 'refs/heads/'
+        return {ref[0][len(prefix):]: ref[4] for ref in refs if ref[0].startswith(prefix)}
+
+    @classmethod
+    @cached
+    def get_refs_info(cls, path: Path) -> List[RefInfo]:
+        """Upstream, push, symref and shas of all branches and tags, listed in a single git call"""
+
+        args = ['git', 'for-each-ref',
+                '--format=%(refname) %(upstream) %(push) %(symref) %(objectname) %(*objectname) %(*objecttype)',
+                'refs/heads', 'refs/remotes', 'refs/tags']
+        # Parsed as git writes it, rather than reading the whole listing into one string first
+        try:
+            return ProcessOutput.refs(cmd.iter_stdout(args, cwd=path, check=True))
+        except CalledProcessError:
+            skip_caching()
             return []
-        branches = ProcessOutput.local_branches(output)
-        return branches
 
     @classmethod
     def get_local_tags_info(cls, path: Path) -> Dict[str, str]:
-        output = cmd.get_stdout("git show-ref --tags", cwd=path)
-        if output is None:
-            return {}
-        return ProcessOutput.tag_shas(output)
+        return GitOffline.get_local_tag_refs_info(path)[0]
+
+    @classmethod
+    @cached
+    def get_local_tag_refs_info(cls, path: Path) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Tag and commit shas of every local tag, from the same git call as branches"""
+
+        return ProcessOutput.local_tags(GitOffline.get_refs_info(path))
 
     @classmethod
     def get_untracked_files(cls, path: Path) -> List[Path]:
-        output = cmd.get_stdout('git ls-files . --exclude-standard --others', cwd=path)
-        if output is None:
-            return []
-        return [Path(line.strip()) for line in output.splitlines()]
+        lines = cmd.iter_stdout(['git', 'ls-files', '.', '--exclude-standard', '--others'], cwd=path)
+        return [Path(line.strip()) for line in lines if line.strip()]
 
     @classmethod
     def new_commits_count(cls, path: Path, upstream: bool = False) -> int:
@@ -196,27 +230,63 @@ class GitOffline:
         :return: Int number of new commits
         """
 
-        local_branch = GitOffline.current_branch(path)
-        upstream_branch = GitOffline.get_upstream_branch(path, local_branch)
-        if local_branch == HEAD or upstream_branch is None:
-            return 0
+        ahead, behind = GitOffline.ahead_behind(path)
+        return behind if upstream else ahead
+
+    @classmethod
+    def ahead_behind(cls, path: Path) -> Tuple[int, int]:
+        """Returns the number of local and upstream commits not in the other branch
+
+        :param Path path: Path to git repo
+        :return: Number of new local commits and new upstream commits, 0 if HEAD has no upstream branch
+        """
+
+        return GitOffline.left_right_commit_counts(path, HEAD, '@{upstream}')
+
+    @classmethod
+    def left_right_commit_counts(cls, path: Path, first: str, second: str) -> Tuple[int, int]:
+        """Returns the number of commits only in first and only in second, counted by a single git call
 
+        :param Path path: Path to git repo
+        :param str first: First ref
+        :param str second: Second ref
+        :return: Number of commits in first but not second, and in second but not first, 0 if either ref is invalid
+        """
+
+        # Expected output format:
+        # > git rev-list --count --left-right HEAD...@{upstream}
+        # 2	1
+        output = cmd.get_stdout(['git', 'rev-list', '--count', '--left-right', f'{first}...{second}'], cwd=path,
+                                shell=False)
+        if output is None:
+            return 0, 0
         try:
-            local_sha = GitOffline.get_branch_sha(path, local_branch)
-            remote_sha = GitOffline.get_branch_sha(path, upstream_branch[0], remote=upstream_branch[1])
-            commits = f'{local_sha}...{remote_sha}'
-            output = cmd.get_stdout(f'git rev-list --count --left-right {commits}', cwd=path)
-            if output is None:
-                return 0
-            index = 1 if upstream else 0
-            return int(output.split()[index])
-        except (CalledProcessError, ValueError):
-            return 0
+            left, _, right = output.partition('\t')
+            return int(left), int(right)
+        except ValueError:
+            return 0, 0
+
+    @classmethod
+    def get_status_info(cls, path: Path) -> Dict[str, Union[Optional[str], int, bool]]:
+        """Current branch, sha, ahead/behind counts, dirty and untracked state from a single git status call"""
+
+        # Untracked and submodule options are passed explicitly so status.showUntrackedFiles and
+        # diff.ignoreSubmodules config can't hide changes
+        args = ['git', 'status', '--porcelain=v2', '--branch', '--untracked-files=normal', '--ignore-submodules=none']
+        lines = cmd.iter_stdout(args, cwd=path)
+        try:
+            return ProcessOutput.status(lines)
+        finally:
+            lines.close()
 
     @classmethod
     def has_untracked_files(cls, path: Path) -> bool:
-        files = GitOffline.get_untracked_files(path)
-        return bool(files)
+        lines = cmd.iter_stdout(['git', 'ls-files', '.', '--exclude-standard', '--others'], cwd=path)
+        try:
+            # Stop git after the first untracked file instead of listing all of them
+            return any(line.strip() for line in lines)
+        finally:
+            lines.close()
 
     @classmethod
     def is_submodule_placeholder(cls, path: Path) -> bool:
@@ -238,13 +308,27 @@ class GitOffline:
 
     @classmethod
     def get_submodule_commit(cls, path: Path, submodule_path: Path) -> Optional[str]:
-        output = cmd.get_stdout(f'git ls-tree {HEAD} {submodule_path}', cwd=path)
+        return GitOffline.get_submodule_commits_info(path, (str(submodule_path),)).get(str(submodule_path))
+
+    @classmethod
+    @cached
+    def get_submodule_commits_info(cls, path: Path, submodule_paths: Tuple[str, ...]) -> Dict[str, str]:
+        """Commit sha of each submodule at HEAD, listed in a single git call
+
+        :param Path path: Path to git repo
+        :param Tuple[str, ...] submodule_paths: Submodule paths relative to repo
+        :return: Commit shas keyed by submodule path
+        """
+
+        if not submodule_paths:
+            return {}
+        output = cmd.get_stdout(['git', 'ls-tree', '-z', HEAD, '--', *submodule_paths], cwd=path, shell=False)
         if output is None:
-            return None
-        components = output.split()
-        return components[2]
+            return {}
+        return ProcessOutput.submodule_commits(output)
 
     @classmethod
+    @cached
     def get_submodules_info(cls, path: Path) -> Dict[str, Dict[str, str]]:
         submodules = GitOffline.get_submodules_info_from_gitmodules(path)
         git_config_submodules = GitOffline.get_submodules_info_from_git_config(path)
@@ -257,22 +341,38 @@ class GitOffline:
 
     @classmethod
     def get_submodules_info_from_gitmodules(cls, path: Path) -> Dict[str, Dict[str, str]]:
-        output = GitOffline.get_config_info(path, 'submodule', path / '.gitmodules')
-        submodules = ProcessOutput.submodules(output)
-        return submodules
+        return GitOffline.get_submodules_info_from_file(path, path / '.gitmodules')
 
     @classmethod
+    @cached
     def get_submodules_info_from_git_config(cls, path: Path) -> Dict[str, Dict[str, str]]:
-        git_dir = GitOffline.git_dir(path)
+        git_dir = GitOffline.git_common_dir(path)
         if git_dir is None:
             return {}
-        output = GitOffline.get_config_info(path, 'submodule', git_dir / 'config')
-        submodules = ProcessOutput.submodules(output)
-        return submodules
+        return GitOffline.get_submodules_info_from_file(path, git_dir / 'config')
+
+    @classmethod
+    def get_submodules_info_from_file(cls, path: Path, file: Path) -> Dict[str, Dict[str, str]]:
+        """Submodule sections of git config file, parsed in Python and falling back to git for unusual syntax
+
+        :param Path path: Path to git repo
+        :param Path file: Git config file to read
+        :return: Submodule values keyed by submodule name
+        """
+
+        try:
+            contents = file.read_text()
+        except OSError:
+            return {}
+        submodules = ProcessOutput.submodules_config(contents)
+        if submodules is not None:
+            return submodules
+        output = GitOffline.get_config_info(path, 'submodule', file)
+        return ProcessOutput.submodules(output)
 
     @classmethod
     def get_config_info(cls, path: Path, name: str, file: Path) -> List[str]:
-        output = cmd.get_stdout(f'git config --file {file} --get-regexp {name}', cwd=path)
+        output = cmd.get_stdout(['git', 'config', '--file', str(file), '--get-regexp', name], cwd=path, shell=False)
         if output is None:
             return []
         return output.splitlines()
@@ -280,46 +380,142 @@ class GitOffline:
     @classmethod
     def git_dir(cls, path: Path) -> Optional[Path]:
         repo_git_path = path / '.git'
-        if not repo_git_path.exists():
-            return None
         if repo_git_path.is_dir():
             return repo_git_path
-        contents = repo_git_path.read_text().strip()
+        try:
+            with open(repo_git_path) as git_file:
+                contents = git_file.readline().strip()
+        except OSError:
+            return None
         gitdir_prefix = 'gitdir: '
         if not contents.startswith(gitdir_prefix):
             return None
-        git_dir_path = Format.remove_prefix(contents, gitdir_prefix)
-        git_dir = repo_git_path.parent / git_dir_path
-        return git_dir.resolve(strict=False)
+        git_dir = Path(contents[len(gitdir_prefix):])
+        if git_dir.is_absolute() and '..' not in git_dir.parts:
+            # Worktrees and absorbed git dirs written by git are already absolute and normalized
+            return git_dir
+        # Relative paths are resolved physically like git does, since '..' after a symlink isn't lexical
+        return (repo_git_path.parent / git_dir).resolve(strict=False)
+
+    @classmethod
+    @cached
+    def git_common_dir(cls, path: Path) -> Optional[Path]:
+        """Git dir holding refs and config shared between worktrees"""
+
+        git_dir = GitOffline.git_dir(path)
+        if git_dir is None:
+            return None
+        # Linked worktrees point to the shared git dir with a commondir file, relative to their own git dir
+        try:
+            common_dir = (git_dir / 'commondir').read_text().strip()
+        except OSError:
+            return git_dir
+        return (git_dir / common_dir).resolve(strict=False)
+
+    @classmethod
+    def read_head(cls, path: Path) -> Tuple[Optional[str], Optional[str]]:
+        """Read current branch and commit sha directly from git dir, falling back to git if HEAD can't be parsed
+
+        :param Path path: Path to git repo
+        :return: Tuple of current branch (None if detached) and commit sha (None if there are no commits)
+        """
+
+        head = GitOffline._read_head_file(path)
+        if head.startswith(HEAD_BRANCH_PREFIX):
+            branch = Format.remove_prefix(head, HEAD_BRANCH_PREFIX)
+            sha = GitOffline._read_branch_sha(path, branch)
+            if sha is not None:
+                return branch, sha
+        elif GitOffline._is_sha(head):
+            return None, head
+        branch = cmd.get_stdout(['git', 'symbolic-ref', '--short', '-q', HEAD], cwd=path, shell=False)
+        return branch, cmd.get_stdout(['git', 'rev-parse', '-q', '--verify', HEAD], cwd=path, shell=False)
+
+    @classmethod
+    def _read_head_file(cls, path: Path) -> str:
+        """Contents of HEAD file in git dir, or empty string if it can't be read or refs aren't stored in files
+
+        Linked worktrees keep HEAD in their own git dir, while branches are read from the common dir
+        """
+
+        if not GitOffline._has_ref_files(path):
+            return ''
+        git_dir = GitOffline.git_dir(path)
+        try:
+            return (git_dir / HEAD).read_text().strip()
+        except (OSError, TypeError):
+            return ''
+
+    @classmethod
+    def _has_ref_files(cls, path: Path) -> bool:
+        """Whether refs are stored as loose and packed ref files that can be read directly
+
+        Repos using the reftable backend keep a placeholder HEAD and store refs in a reftable dir instead
+        """
+
+        git_dir = GitOffline.git_common_dir(path)
+        return git_dir is not None and not (git_dir / 'reftable').is_dir()
+
+    @classmethod
+    def _read_branch_sha(cls, path: Path, branch: str) -> Optional[str]:
+        git_dir = GitOffline.git_common_dir(path)
+        if git_dir is None:
+            return None
+        try:
+            sha = (git_dir / 'refs' / 'heads' / branch).read_text().strip()
+        except OSError:
+            sha = None
+        if GitOffline._is_sha(sha):
+            return sha
+        try:
+            packed_refs = (git_dir / 'packed-refs').read_text()
+        except OSError:
+            return None
+        # Expected output:
+        # <sha> refs/heads/<branch>
+        ref = f' refs/heads/{branch}'
+        for line in packed_refs.splitlines():
+            if line.endswith(ref) and GitOffline._is_sha(line[:-len(ref)]):
+                return line[:-len(ref)]
+        return None
+
+    @classmethod
+    def _is_sha(cls, value: Optional[str]) -> bool:
+        return value is not None and len(value) in (40, 64) and all(c in hexdigits for c in value)
 
     @classmethod
     def is_submodule_initialized(cls, path: Path, submodule_path: Path) -> bool:
         submodules = GitOffline.get_submodules_info_from_git_config(path)
-        return str(submodule_path) in submodules.keys()
+        return str(submodule_path) in submodules
 
     @classmethod
     def is_submodule_cloned(cls, path: Path, submodule_path: Path) -> bool:
-        git_dir = GitOffline.git_dir(path)
+        full_path = path / submodule_path
+        git_dir = GitOffline.git_dir(full_path)
         if git_dir is None:
             return False
-        full_path = path / submodule_path
         return git_dir.is_dir() and fs.has_contents(git_dir) and full_path.is_dir() and fs.has_contents(full_path)
 
     @classmethod
     def lfs_hooks_installed(cls, path: Path) -> bool:
         hooks = [
-            ['git lfs pre-push', '.git/hooks/pre-push'],
-            ['git lfs post-checkout', '.git/hooks/post-checkout'],
-            ['git lfs post-commit', '.git/hooks/post-commit'],
-            ['git lfs post-merge', '.git/hooks/post-merge']
+            ['git lfs pre-push', 'pre-push'],
+            ['git lfs post-checkout', 'post-checkout'],
+            ['git lfs post-commit', 'post-commit'],
+            ['git lfs post-merge', 'post-merge']
         ]
 
+        # Hooks live in the common git dir, which isn't path/.git for submodules and worktrees
+        git_dir = GitOffline.git_common_dir(path)
+        if git_dir is None:
+            return False
         for hook in hooks:
             command = hook[0]
-            file_path = path / hook[1]
-            if not file_path.exists():
+            file_path = git_dir / 'hooks' / hook[1]
+            try:
+                file_text = file_path.read_text()
+            except (FileNotFoundError, NotADirectoryError):
                 return False
-            file_text = file_path.read_text()
             if command not in file_text:
                 return False
         return True
@@ -333,84 +529,103 @@ class GitOffline:
             'required'
         ]
 
-        for lfs_filter in lfs_filters:
-            result = cmd.run_silent(f'git config --get filter.lfs.{lfs_filter}', cwd=path)
-            if result.returncode != 0:
-                return False
-        return True
+        config = GitOffline.get_config(path)
+        return all(f'filter.lfs.{lfs_filter}' in config for lfs_filter in lfs_filters)
 
     @classmethod
+    @invalidates_cache
     def uninstall_lfs_hooks(cls, path: Path) -> List[CompletedProcess]:
         commands = [
-            'git lfs uninstall --local',
-            'git lfs uninstall --system',
-            'git lfs uninstall'
+            ['git', 'lfs', 'uninstall', '--local'],
+            ['git', 'lfs', 'uninstall', '--system'],
+            ['git', 'lfs', 'uninstall']
         ]
 
-        results = []
-        for command in commands:
-            result = cmd.run_silent(command)
-            results.append(result)
+        results = [cmd.run_silent(command, cwd=path, shell=False) for command in commands]
 
         assert not GitOffline.lfs_hooks_installed(path)
         return results
 
     @classmethod
+    @invalidates_cache
     def uninstall_lfs_filters(cls, path: Path) -> List[CompletedProcess]:
         commands = [
-            'git config --system --unset filter.lfs.clean',
-            'git config --system --unset filter.lfs.smudge',
-            'git config --system --unset filter.lfs.process',
-            'git config --system --unset filter.lfs.required'
+            ['git', 'config', '--system', '--unset', 'filter.lfs.clean'],
+            ['git', 'config', '--system', '--unset', 'filter.lfs.smudge'],
+            ['git', 'config', '--system', '--unset', 'filter.lfs.process'],
+            ['git', 'config', '--system', '--unset', 'filter.lfs.required']
         ]
 
-        results = []
-        for command in commands:
-            result = cmd.run_silent(command)
-            results.append(result)
+        results = [cmd.run_silent(command, cwd=path, shell=False) for command in commands]
 
+        # Config is read from cache within a cache session, which is otherwise only invalidated on return
+        invalidate_cache()
         assert not GitOffline.lfs_filters_installed(path)
         return results
 
     @classmethod
     def is_lfs_file_pointer(cls, path: Path, file: str) -> bool:
-        output = cmd.get_stdout(f'git lfs ls-files -I "{file}"', cwd=path)
-        if output is None:
-            # TODO: Should this return None?
-            return False
-        components = output.split()
-        return components[1] == '-'
+        files = GitOffline.get_lfs_files_info(path, include=file)
+        # TODO: Should this return None if file isn't tracked by lfs?
+        return next(iter(files.values()), False)
 
     @classmethod
     def is_lfs_file_not_pointer(cls, path: Path, file: str) -> bool:
-        output = cmd.get_stdout(f'git lfs ls-files -I "{file}"', cwd=path)
+        files = GitOffline.get_lfs_files_info(path, include=file)
+        # TODO: Should this return None if file isn't tracked by lfs?
+        return not next(iter(files.values()), True)
+
+    @classmethod
+    @cached
+    def get_lfs_files_info(cls, path: Path, include: Optional[str] = None) -> Dict[str, bool]:
+        """Whether each lfs file is checked out as a pointer, listed in a single git lfs call
+
+        Callers checking many files should look them up in the full listing rather than passing each one as include
+
+        :param Path path: Path to git repo
+        :param Optional[str] include: Only list files matching pattern
+        :return: True for files that are only pointers, keyed by file path
+        """
+
+        args = [] if include is None else ['-I', include]
+        output = cmd.get_stdout(['git', 'lfs', 'ls-files', *args], cwd=path, shell=False)
         if output is None:
-            # TODO: Should this return None?
-            return False
-        components = output.split()
-        return components[1] == '*'
+            return {}
+        return ProcessOutput.lfs_files(output)
+
+    @classmethod
+    @cached
+    def get_config(cls, path: Path) -> Dict[str, List[str]]:
+        """All git config values visible from repo, read with a single git call
+
+        :param Path path: Path to git repo
+        :return: Config values keyed by variable name, with the last value taking precedence
+        """
+
+        output = cmd.get_stdout(['git', 'config', '--list', '-z'], cwd=path, shell=False)
+        if output is None:
+            return {}
+        return ProcessOutput.config(output)
 
     @classmethod
     def get_git_config(cls, path: Path) -> Optional[str]:
-        return cmd.get_stdout('git config --list --show-origin', cwd=path)
+        return cmd.get_stdout(['git', 'config', '--list', '--show-origin'], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def stash(cls, path: Path) -> CompletedProcess:
-        return cmd.run('git stash', cwd=path)
+        return cmd.run(['git', 'stash'], cwd=path, shell=False)
 
     @classmethod
     def status(cls, path: Path, verbose: bool = False) -> CompletedProcess:
-        args = ''
-        if verbose:
-            args = ' -vv '
-        return cmd.run(f'git status {args}', cwd=path)
+        args = ['-vv'] if verbose else []
+        return cmd.run(['git', 'status', *args], cwd=path, shell=False)
 
     @classmethod
     def current_head_commit_sha(cls, path: Path, short: bool = False) -> Optional[str]:
-        args = ''
-        if short:
-            args = ' --short '
-        return cmd.get_stdout(f'git rev-parse {args} {HEAD}', cwd=path)
+        if not short:
+            return GitOffline.read_head(path)[1]
+        return GitOffline.get_sha(path, ref=HEAD, short=short)
 
     @classmethod
     def get_branch_sha(cls, path: Path, branch: str, remote: Optional[str] = None,
@@ -419,50 +634,56 @@ class GitOffline:
         return GitOffline.get_sha(path, ref=branch, short=short)
 
     @classmethod
+    @invalidates_cache
     def add(cls, path: Path, files: List[str]) -> CompletedProcess:
-        files = " ".join(files)
-        return cmd.run(f"git add {files}", cwd=path)
+        return cmd.run(['git', 'add', *files], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def commit(cls, path: Path, message: str) -> CompletedProcess:
-        return cmd.run(f"git commit -m '{message}'", cwd=path)
+        return cmd.run(['git', 'commit', '-m', message], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def create_local_branch(cls, path: Path, name: str, branch: Optional[str] = None,
                             remote: Optional[str] = None, track: bool = True) -> CompletedProcess:
         remote = '' if remote is None else f'{remote}/'
         start_point = HEAD if branch is None else f'{remote}{branch}'
 
-        # TODO: Use a list for args and join with ' '
-        args = ''
-        if track:
-            args += ' --track '
-        else:
-            args += ' --no-track '
-        return cmd.run(f"git branch {args} {name} {start_point}", cwd=path)
+        args = ['--track'] if track else ['--no-track']
+        return cmd.run(['git', 'branch', *args, name, start_point], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def delete_local_branch(cls, path: Path, branch: str, force: bool = False) -> CompletedProcess:
-        args = ''
+        args = []
         if force:
-            args += ' --force '
-        return cmd.run(f'git branch --delete {args} {branch}', cwd=path)
+            args.append('--force')
+        return cmd.run(['git', 'branch', '--delete', *args, branch], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def delete_local_tag(cls, path: Path, name: str) -> CompletedProcess:
-        return cmd.run(f'git tag --delete {name}', cwd=path)
+        return cmd.run(['git', 'tag', '--delete', name], cwd=path, shell=False)
+
+    @classmethod
+    @invalidates_cache
+    def delete_local_tags(cls, path: Path, names: List[str]) -> CompletedProcess:
+        return cmd.run(['git', 'tag', '--delete', *names], cwd=path, shell=False)
 
     @classmethod
+    @lru_cache(maxsize=1024)
     def check_ref_format(cls, refname: str) -> bool:
-        """Check git ref format
+        """Check git ref format, result only depends on refname so it's cached
 
         :param str refname: Files to git add
         """
 
-        result = cmd.run_silent(f'git check-ref-format --normalize {refname}')
+        result = cmd.run_silent(['git', 'check-ref-format', '--normalize', refname], shell=False)
         return result.returncode == 0
 
     @classmethod
+    @invalidates_cache
     def reset_timestamp(cls, path: Path, timestamp: str, ref: str, author: Optional[str] = None) -> CompletedProcess:
         """Reset branch to upstream or checkout tag/sha as detached HEAD
 
@@ -477,33 +698,29 @@ class GitOffline:
         return GitOffline.checkout(path, rev)
 
     @classmethod
+    @invalidates_cache
     def submodule_add(cls, path: Path, url: str, branch: Optional[str] = None, force: bool = False,
                       name: Optional[str] = None, reference: Optional[str] = None, depth: Optional[int] = None,
                       submodule_path: Optional[Path] = None) -> CompletedProcess:
-        args = ''
+        args = []
         if branch is not None:
-            args += f' -b {branch} '
+            args += ['-b', branch]
         if force:
-            args += ' --force '
+            args.append('--force')
         if name is not None:
-            args += f' --name {name} '
+            args += ['--name', name]
         if reference is not None:
-            args += f' --reference {reference} '
+            args += ['--reference', reference]
         if depth is not None:
-            args += f' --depth {depth} '
-        if submodule_path is not None:
-            submodule_path = str(submodule_path)
-        else:
-            submodule_path = ''
-        return cmd.run(f'git submodule add {args} {url} {submodule_path}', cwd=path)
+            args += ['--depth', str(depth)]
+        paths = [] if submodule_path is None else [str(submodule_path)]
+        return cmd.run(['git', 'submodule', 'add', *args, url, *paths], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def submodule_absorbgitdirs(cls, path: Path, paths: Optional[List[Path]] = None) -> CompletedProcess:
-        if paths is not None and paths:
-            paths = ' '.join([str(p) for p in paths])
-        else:
-            paths = ''
-        return cmd.run(f'git submodule absorbgitdirs {paths}', cwd=path)
+        paths = [] if paths is None else [str(p) for p in paths]
+        return cmd.run(['git', 'submodule', 'absorbgitdirs', *paths], cwd=path, shell=False)
 
     @classmethod
     def submodule_foreach_clean(cls, path: Path, recursive: bool = False) -> CompletedProcess:
@@ -511,74 +728,71 @@ class GitOffline:
 
     @classmethod
     def submodule_foreach_reset(cls, path: Path, recursive: bool = False, hard: bool = False) -> CompletedProcess:
-        args = ''
-        if hard:
-            args += ' --hard '
-        return GitOffline.submodule_foreach(path, f'git reset {args}', recursive=recursive)
+        command = 'git reset --hard' if hard else 'git reset'
+        return GitOffline.submodule_foreach(path, command, recursive=recursive)
 
     @classmethod
+    def submodule_foreach_clean_and_reset(cls, path: Path, recursive: bool = False,
+                                          hard: bool = False) -> CompletedProcess:
+        """Clean and reset submodules in a single traversal, rather than one foreach for each command"""
+
+        reset = 'git reset --hard' if hard else 'git reset'
+        return GitOffline.submodule_foreach(path, f'git clean -ffdx && {reset}', recursive=recursive)
+
+    @classmethod
+    @invalidates_cache
     def submodule_foreach(cls, path: Path, command: str, recursive: bool = False) -> CompletedProcess:
-        args = ''
-        if recursive:
-            args += ' --recursive '
-        return cmd.run(f'git submodule foreach {args} {command}', cwd=path)
+        # Command is passed as a single argument, which git runs with the shell in each submodule
+        args = ['--recursive'] if recursive else []
+        return cmd.run(['git', 'submodule', 'foreach', *args, command], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def submodule_sync(cls, path: Path, recursive: bool = False,
                        paths: Optional[List[Path]] = None) -> CompletedProcess:
-        args = ''
-        if recursive:
-            args += ' --recursive '
-        if paths is not None and paths:
-            paths = ' '.join([str(p) for p in paths])
-        else:
-            paths = ''
-        return cmd.run(f'git submodule sync {args} {paths}', cwd=path)
+        args = ['--recursive'] if recursive else []
+        paths = [] if paths is None else [str(p) for p in paths]
+        return cmd.run(['git', 'submodule', 'sync', *args, *paths], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def submodule_deinit(cls, path: Path, force: bool = False, paths: Optional[List[Path]] = None) -> CompletedProcess:
-        args = ''
-        if force:
-            args += ' --force '
-        if paths is not None and paths:
-            paths = ' '.join([str(p) for p in paths])
-        else:
-            paths = ' --all '
-        return cmd.run(f'git submodule deinit {args} {paths}', cwd=path)
+        args = ['--force'] if force else []
+        paths = ['--all'] if not paths else [str(p) for p in paths]
+        return cmd.run(['git', 'submodule', 'deinit', *args, *paths], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def submodule_init(cls, path: Path, paths: Optional[List[Path]] = None) -> CompletedProcess:
-        if paths is not None and paths:
-            paths = ' '.join([str(p) for p in paths])
-        else:
-            paths = ''
-        return cmd.run(f'git submodule init {paths}', cwd=path)
+        paths = [] if paths is None else [str(p) for p in paths]
+        return cmd.run(['git', 'submodule', 'init', *paths], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def submodule_set_branch(cls, path: Path, submodule_path: Path, branch: str) -> CompletedProcess:
-        return cmd.run(f'git submodule set-url --branch {branch} {submodule_path}', cwd=path)
+        return cmd.run(['git', 'submodule', 'set-branch', '--branch', branch, str(submodule_path)], cwd=path,
+                       shell=False)
 
     @classmethod
+    @invalidates_cache
     def submodule_unset_branch(cls, path: Path, submodule_path: Path) -> CompletedProcess:
-        return cmd.run(f'git submodule set-url --default {submodule_path}', cwd=path)
+        return cmd.run(['git', 'submodule', 'set-branch', '--default', str(submodule_path)], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def submodule_set_url(cls, path: Path, submodule_path: Path, url: str) -> CompletedProcess:
-        return cmd.run(f'git submodule set-url {submodule_path} {url}', cwd=path)
+        return cmd.run(['git', 'submodule', 'set-url', str(submodule_path), url], cwd=path, shell=False)
 
     @classmethod
     def submodule_status(cls, path: Path, cached: bool = False, recursive: bool = False,
                          paths: Optional[List[Path]] = None) -> CompletedProcess:
-        args = ''
+        args = []
         if cached:
-            args += ' --cached '
+            args.append('--cached')
         if recursive:
-            args += ' -- recursive '
-        if paths is not None and paths:
-            paths = ' '.join([str(p) for p in paths])
-        else:
-            paths = ''
-        return cmd.run(f'git submodule status {args} {paths}', cwd=path)
+            args.append('--recursive')
+        paths = [] if paths is None else [str(p) for p in paths]
+        return cmd.run(['git', 'submodule', 'status', *args, *paths], cwd=path, shell=False)
 
     @classmethod
     def has_ignored_files(cls, path: Path) -> bool:
@@ -587,7 +801,14 @@ class GitOffline:
 
     @classmethod
     def check_ignore(cls, path: Path) -> List[str]:
-        output = cmd.get_stdout('git check-ignore -v *', cwd=path)
+        # Same files a shell would pass for *, which skips hidden files
+        try:
+            files = sorted(entry.name for entry in os.scandir(path) if not entry.name.startswith('.'))
+        except OSError:
+            return []
+        if not files:
+            return []
+        output = cmd.get_stdout(['git', 'check-ignore', '-v', *files], cwd=path, shell=False)
         if output is None:
             return []
         # TODO: Process output
@@ -596,6 +817,7 @@ class GitOffline:
         return output.splitlines()
 
     @classmethod
+    @invalidates_cache
     def clean(cls, path: Path, untracked_directories: bool = False, force: bool = False,
               ignored: bool = False, untracked_files: bool = False) -> CompletedProcess:
         """Discard changes for repo
@@ -616,34 +838,39 @@ class GitOffline:
             args += 'X'
         if untracked_files:
             args += 'x'
-        return cmd.run(f"git clean {args}", cwd=path)
+        return cmd.run(['git', 'clean', args], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def checkout(cls, path: Path, ref: str, track: bool = False) -> CompletedProcess:
-        track = ' --track ' if track else ''
-        return cmd.run(f"git -c advice.detachedHead=false checkout {track} {ref}", cwd=path)
+        args = ['--track'] if track else []
+        return cmd.run(['git', '-c', 'advice.detachedHead=false', 'checkout', *args, ref], cwd=path, shell=False)
 
     @classmethod
     def local_branch_exists(cls, path: Path, branch: str) -> bool:
-        result = cmd.run_silent(f"git rev-parse --quiet --verify refs/heads/{branch}", cwd=path)
-        return result.returncode == 0
+        return branch in GitOffline.get_local_branches_info(path)
 
     @classmethod
+    @cached
     def get_tracking_branches_info(cls, path: Path) -> Dict[str, Dict[str, str]]:
-        local_branches = GitOffline.get_local_branches_info(path)
+        refs = GitOffline.get_refs_info(path)
+        # Upstream and push refs are listed even when they don't exist locally, which git rev-parse treats as unset
+        existing_refs = {ref[0] for ref in refs}
         upstream_branches = {}
-        for branch in local_branches:
-            upstream_branch = GitOffline.get_upstream_branch(path, branch)
-            push_branch_info = GitOffline.get_push_branch(path, branch)
+        for refname, upstream, push, _, _, _, _ in refs:
+            if not refname.startswith('refs/heads/') or upstream not in existing_refs:
+                continue
+            branch = refname[len('refs/heads/'):]
+            upstream_branch = ProcessOutput.tracking_branches(upstream)
+            push_branch_info = ProcessOutput.tracking_branches(push) if push in existing_refs else None
             push_branch = None if push_branch_info is None else push_branch_info[0]
             push_remote = None if push_branch_info is None else push_branch_info[1]
-            if upstream_branch is not None:
-                upstream_branches[branch] = {
-                    'upstream_branch': upstream_branch[0],
-                    'upstream_remote': upstream_branch[1],
-                    'push_branch': push_branch,
-                    'push_remote': push_remote
-                }
+            upstream_branches[branch] = {
+                'upstream_branch': upstream_branch[0],
+                'upstream_remote': upstream_branch[1],
+                'push_branch': push_branch,
+                'push_remote': push_remote
+            }
         return upstream_branches
 
     @classmethod
@@ -656,27 +883,27 @@ class GitOffline:
 
     @classmethod
     def rev_parse_tracking_branch(cls, path: Path, branch: str, arg: str) -> Optional[Tuple[str, Optional[str]]]:
-        output = cmd.get_stdout(f'git rev-parse --symbolic-full-name {branch}@{{{arg}}}', cwd=path)
+        output = cmd.get_stdout(['git', 'rev-parse', '--symbolic-full-name', f'{branch}@{{{arg}}}'], cwd=path,
+                                shell=False)
         if output is None:
             return None
         return ProcessOutput.tracking_branches(output)
 
     @classmethod
     def get_full_branch_ref(cls, path: Path, branch: str) -> Optional[str]:
-        return cmd.get_stdout(f'git rev-parse --symbolic-full-name {branch}', cwd=path)
+        return cmd.get_stdout(['git', 'rev-parse', '--symbolic-full-name', branch], cwd=path, shell=False)
 
     @classmethod
     def git_remote_show(cls, path: Path, remote: str) -> Optional[str]:
-        return cmd.get_stdout(f'git remote show {remote}', cwd=path)
+        return cmd.get_stdout(['git', 'remote', 'show', remote], cwd=path, shell=False)
 
     @classmethod
     def has_tracking_branch(cls, path: Path, branch: str) -> bool:
-        result = cmd.run_silent(f'git config --get branch.{branch}.merge', cwd=path)
-        return result.returncode == 0
+        return f'branch.{branch}.merge' in GitOffline.get_config(path)
 
     @classmethod
     def check_remote_url(cls, path: Path, remote, url) -> bool:
-        output = cmd.get_stdout(f"git remote get-url {remote}", cwd=path)
+        output = cmd.get_stdout(['git', 'remote', 'get-url', remote], cwd=path, shell=False)
         if output is None:
             # TODO: Should this return None?
             return False
@@ -688,21 +915,29 @@ class GitOffline:
 
     @classmethod
     def current_branch(cls, path: Path) -> Optional[str]:
-        branch = cmd.get_stdout(f'git rev-parse --abbrev-ref {HEAD}', cwd=path)
+        head = GitOffline._read_head_file(path)
+        if head.startswith(HEAD_BRANCH_PREFIX):
+            return Format.remove_prefix(head, HEAD_BRANCH_PREFIX)
+        if GitOffline._is_sha(head):
+            return HEAD
+        branch = cmd.get_stdout(['git', 'rev-parse', '--abbrev-ref', HEAD], cwd=path, shell=False)
         if branch is None:
             return None
         return Format.remove_prefix(branch, 'heads/')
 
     @classmethod
+    @invalidates_cache
     def set_upstream_branch(cls, path: Path, local_branch: str, upstream_branch: str,
                             remote: Optional[str] = None) -> CompletedProcess:
         remote_arg = ''
         if remote is not None:
             remote_arg = f'{remote}/'
 
-        return cmd.run(f'git branch --set-upstream-to={remote_arg}{upstream_branch} {local_branch}', cwd=path)
+        return cmd.run(['git', 'branch', f'--set-upstream-to={remote_arg}{upstream_branch}', local_branch], cwd=path,
+                       shell=False)
 
     @classmethod
+    @invalidates_cache
     def git_config_unset_all_local(cls, path: Path, variable: str) -> CompletedProcess:
         """Unset all local git config values for given variable key
 
@@ -711,13 +946,14 @@ class GitOffline:
         """
 
         try:
-            return cmd.run(f'git config --local --unset-all {variable}', cwd=path)
+            return cmd.run(['git', 'config', '--local', '--unset-all', variable], cwd=path, shell=False)
         except CalledProcessError as err:
             # git returns error code 5 when trying to unset variable that doesn't exist
             if err.returncode != 5:
                 raise
 
     @classmethod
+    @invalidates_cache
     def git_config_add_local(cls, path: Path, variable: str, value: str) -> CompletedProcess:
         """Add local git config value for given variable key
 
@@ -727,7 +963,20 @@ class GitOffline:
         """
 
         # TODO: Use Python ConfigParser for this
-        return cmd.run(f'git config --local --add "{variable}" "{value}"', cwd=path)
+        return cmd.run(['git', 'config', '--local', '--add', variable, value], cwd=path, shell=False)
+
+    @classmethod
+    @invalidates_cache
+    def git_config_replace_all_local(cls, path: Path, config: GitConfig) -> List[CompletedProcess]:
+        """Replace all local git config values for given variable keys, with one git call per key
+
+        :param Path path: Path to git repo
+        :param GitConfig config: Fully qualified git config variables and values
+        :return: Completed process for each variable
+        """
+
+        return [cmd.run(['git', 'config', '--local', '--replace-all', variable, value], cwd=path, shell=False)
+                for variable, value in config.items()]
 
     @classmethod
     def is_detached(cls, path: Path) -> bool:
@@ -735,53 +984,71 @@ class GitOffline:
 
     @classmethod
     def get_tag_commit_sha(cls, path: Path, tag: str) -> Optional[str]:
-        return cmd.get_stdout(f'git rev-list -n 1 {tag}', cwd=path)
+        sha = GitOffline.get_local_tag_commits_info(path).get(tag)
+        if sha is not None:
+            return sha
+        sha = GitDaemon.resolve(path, f'{tag}^{{commit}}')
+        if sha is not None:
+            return sha
+        return cmd.get_stdout(['git', 'rev-list', '-n', '1', tag], cwd=path, shell=False)
+
+    @classmethod
+    def get_local_tag_commits_info(cls, path: Path) -> Dict[str, str]:
+        """Commit sha of every local tag, with annotated tags peeled to the commit they point to"""
+
+        return GitOffline.get_local_tag_refs_info(path)[1]
 
     @classmethod
     def get_sha(cls, path: Path, ref: str = HEAD, short: bool = False) -> Optional[str]:
-        args = ''
-        if short:
-            args = ' --short '
-        return cmd.get_stdout(f'git rev-parse {args} {ref}', cwd=path)
+        if not short:
+            if GitOffline._is_sha(ref):
+                # A full sha resolves to itself, same as git rev-parse without --verify
+                return ref.lower()
+            sha = GitDaemon.resolve(path, ref)
+            if sha is not None:
+                return sha
+        args = ['--short'] if short else []
+        return cmd.get_stdout(['git', 'rev-parse', *args, ref], cwd=path, shell=False)
 
     @classmethod
     def number_of_commits_between_refs(cls, path: Path, first: str, second: str) -> int:
-        output = cmd.get_stdout(f"git rev-list {first}..{second} --count", cwd=path)
+        output = cmd.get_stdout(['git', 'rev-list', f'{first}..{second}', '--count'], cwd=path, shell=False)
         if output is None:
             # TODO: Should this return None?
             return 0
         return int(output)
 
     @classmethod
+    @invalidates_cache
     def reset(cls, path: Path, ref: str = HEAD, hard: bool = False, mixed: bool = False,
               soft: bool = False, merge: bool = False, keep: bool = False) -> CompletedProcess:
-        args = ''
+        args = []
         if sum([hard, mixed, soft, merge, keep]) > 1:
             raise Exception('Only one of args hard, mixed, soft, merge, keep allowed to be true')
         if hard:
-            args = ' --hard '
+            args = ['--hard']
         if mixed:
-            args = ' --mixed '
+            args = ['--mixed']
         if soft:
-            args = ' --soft '
+            args = ['--soft']
         if merge:
-            args = ' --merge '
+            args = ['--merge']
         if keep:
-            args = ' --keep '
-        return cmd.run(f"git reset {args} {ref}", cwd=path)
+            args = ['--keep']
+        return cmd.run(['git', 'reset', *args, ref], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def reset_back(cls, path: Path, number: int) -> CompletedProcess:
-        sha = GitOffline.current_head_commit_sha(path)
-        result = cmd.run(f"git reset --hard {HEAD}~{number}", cwd=path)
+        # The sha is only needed to verify the reset, which is skipped along with asserts when run with -O
+        sha = GitOffline.current_head_commit_sha(path) if __debug__ else None
+        result = cmd.run(['git', 'reset', '--hard', f'{HEAD}~{number}'], cwd=path, shell=False)
         assert GitOffline.number_of_commits_between_refs(path, HEAD, sha) == number
         return result
 
     @classmethod
     def has_no_commits_between_refs(cls, path: Path, start: str, end: str) -> bool:
-        result_1 = GitOffline.number_of_commits_between_refs(path, start, end) == 0
-        result_2 = GitOffline.number_of_commits_between_refs(path, end, start) == 0
-        return result_1 and result_2
+        return GitOffline.left_right_commit_counts(path, start, end) == (0, 0)
 
     @classmethod
     def is_ahead_by_number_commits(cls, path: Path, start: str, end: str, number_commits: int) -> bool:
@@ -793,48 +1060,97 @@ class GitOffline:
 
     @classmethod
     def number_commits_ahead(cls, path: Path, start: str, end: str) -> int:
-        return GitOffline.number_of_commits_between_refs(path, end, start)
+        return GitOffline.left_right_commit_counts(path, start, end)[0]
 
     @classmethod
     def number_commits_behind(cls, path: Path, start: str, end: str) -> int:
-        return GitOffline.number_of_commits_between_refs(path, start, end)
+        return GitOffline.left_right_commit_counts(path, start, end)[1]
 
     @classmethod
+    @invalidates_cache
     def abort_rebase(cls, path: Path) -> CompletedProcess:
-        return cmd.run('git rebase --abort', cwd=path)
+        return cmd.run(['git', 'rebase', '--abort'], cwd=path, shell=False)
 
     @classmethod
-    def get_commit_messages_behind(cls, path: Path, ref: str, count: int = 1) -> List[str]:
-        results = []
-        commit_number = 0
-        while commit_number < count:
-            result = GitOffline.get_commit_message(path, f"{ref}~{commit_number}")
-            results.append(result)
-            commit_number += 1
-        return results
+    def get_commit_messages_behind(cls, path: Path, ref: str, count: int = 1) -> List[Optional[str]]:
+        if count <= 0:
+            return []
+        messages = GitOffline.iter_commit_messages(path, ref)
+        try:
+            results = list(islice(messages, count))
+        finally:
+            messages.close()
+        # Refs past the root commit don't resolve, so they have no message
+        return results + [None] * (count - len(results))
+
+    @classmethod
+    def iter_commit_messages(cls, path: Path, ref: str) -> Iterator[Optional[str]]:
+        """Yield commit messages of ref and its first parents, newest first
+
+        Messages are parsed as git log writes them, so git is stopped when the caller stops iterating
+
+        :param Path path: Path to git repo
+        :param str ref: Ref to start from
+        :return: Commit messages, None for empty messages
+        """
+
+        # Expected output format, with commits separated by NUL:
+        # > git log --first-parent --format=%B -z
+        # Second commit
+        #
+        # \0First commit
+        #
+        # Body of first commit
+
+        lines = cmd.iter_stdout(['git', 'log', '--first-parent', '--format=%B', '-z', ref], cwd=path)
+        try:
+            message = []
+            for line in lines:
+                *ends, line = line.split('\0')
+                for end in ends:
+                    message.append(end)
+                    yield '\n'.join(message).strip() or None
+                    message = []
+                message.append(line)
+            if any(message):
+                yield '\n'.join(message).strip() or None
+        finally:
+            lines.close()
 
     @classmethod
     def get_commit_message(cls, path: Path, ref: str) -> Optional[str]:
-        return cmd.get_stdout(f"git log --format=%B -n 1 {ref}", cwd=path)
+        commit = GitDaemon.read_object(path, f'{ref}^{{commit}}')
+        if commit is not None:
+            return ProcessOutput.commit_message(commit[1])
+        return cmd.get_stdout(['git', 'log', '--format=%B', '-n', '1', ref], cwd=path, shell=False)
 
     @classmethod
+    @cached
     def is_shallow_repo(cls, path: Path) -> bool:
-        output = cmd.get_stdout("git rev-parse --is-shallow-repository", cwd=path)
+        # Shallow clones record their boundary commits in the shallow file, which git removes when unshallowing
+        git_dir = GitOffline.git_common_dir(path)
+        if git_dir is not None:
+            return (git_dir / 'shallow').is_file()
+        output = cmd.get_stdout(['git', 'rev-parse', '--is-shallow-repository'], cwd=path, shell=False)
         if output is None:
             # TODO: Should this return None?
             return False
         return output == "true"
 
     @classmethod
+    @cached
     def get_remote_branches_info(cls, path: Path, remote: str) -> Tuple[List[str], Optional[str]]:
-        output = cmd.get_stdout('git branch -r', cwd=path)
-        if output is None:
-            return [], None
-        return ProcessOutput.remote_branches(output, remote=remote)
+        remotes = GitOffline.get_all_remote_branches_info(path)
+        return remotes.get(remote, ([], None))
+
+    @classmethod
+    @cached
+    def get_all_remote_branches_info(cls, path: Path) -> Dict[str, Tuple[List[str], Optional[str]]]:
+        return ProcessOutput.all_remote_branches(GitOffline.get_refs_info(path))
 
     @classmethod
     def get_commit_date(cls, path: Path, commit: str) -> Optional[datetime]:
-        output = cmd.get_stdout(f'git show -s --format=%ci {commit}', cwd=path)
+        output = cmd.get_stdout(['git', 'show', '-s', '--format=%ci', commit], cwd=path, shell=False)
         if output is None:
             return None
         date = datetime.strptime(output, '%Y-%m-%d %H:%M:%S %z')
@@ -1,20 +1,24 @@
 """Misc git utils"""
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from subprocess import CompletedProcess
-from typing import Dict, List, Optional
+from subprocess import CalledProcessError, CompletedProcess
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
 
 import pygoodle.command as cmd
 import pygoodle.filesystem as fs
-from pygoodle.format import Format
 
-from .constants import HEAD, ORIGIN
+from .cache import cached, in_cache_session, invalidates_cache, skip_caching
+from .constants import HEAD, MAX_JOBS, ORIGIN, SUBMODULE_JOBS
 from .process_output import ProcessOutput
 
+T = TypeVar('T')
+
 
 class GitOnline:
 
     @classmethod
+    @invalidates_cache
     def pull(cls, path: Path, remote: Optional[str] = None, branch: Optional[str] = None,
              rebase: bool = False, prune: bool = False, tags: bool = False,
              jobs: Optional[int] = None, no_edit: bool = False, autostash: bool = False,
@@ -26,68 +30,77 @@ class GitOnline:
             remote = ORIGIN if remote is None else remote
             refspec = f'refs/heads/{branch}:refs/remotes/{remote}/heads/{branch}'
 
-        remote = '' if remote is None else remote
-        refspec = '' if refspec is None else refspec
-
-        args = ''
+        args = []
         if rebase:
-            args += ' --rebase '
+            args.append('--rebase')
         if prune:
-            args += ' --prune '
+            args.append('--prune')
         if tags:
-            args += ' --tags '
+            args.append('--tags')
         if no_edit:
-            args += ' --no-edit '
+            args.append('--no-edit')
         if autostash:
-            args += ' --autostash '
+            args.append('--autostash')
         if jobs is not None:
-            args += f' --jobs={jobs} '
+            args.append(f'--jobs={jobs}')
         if depth is not None:
-            args += f' --depth={depth} '
+            args.append(f'--depth={depth}')
         if fetch_all:
-            args += f' --all '
-        return cmd.run(f'git pull {args} {remote} {refspec}', cwd=path)
+            args.append('--all')
+        return cmd.run(['git', 'pull', *args, *GitOnline._remote_args(remote, refspec)], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def pull_lfs(cls, path: Path) -> CompletedProcess:
         """Pull lfs files"""
 
-        return cmd.run('git lfs pull', cwd=path)
+        return cmd.run(['git', 'lfs', 'pull'], cwd=path, shell=False)
 
     # See: https://github.blog/2020-12-21-get-up-to-speed-with-partial-clone-and-shallow-clone/
     @classmethod
+    @invalidates_cache
     def clone(cls, path: Path, url: str, depth: Optional[int] = None, branch: Optional[str] = None,
               tag: Optional[str] = None, jobs: Optional[int] = None, single_branch: bool = False,
-              blobless: bool = False, treeless: bool = False, origin: Optional[str] = None) -> CompletedProcess:
+              blobless: bool = False, treeless: bool = False, origin: Optional[str] = None,
+              recurse_submodules: bool = False, no_checkout: bool = False) -> CompletedProcess:
         if path.is_dir():
             if fs.has_contents(path):
                 raise Exception(f'Existing directory at clone path {path}')
             fs.remove_dir(path)
 
-        args = ''
+        args = []
         if branch is not None:
-            args += f' --branch {branch} '
+            args += ['--branch', branch]
         elif tag is not None:
-            args += f' --branch {tag} '
+            args += ['--branch', tag]
 
         if single_branch:
-            args += ' --single-branch '
+            args.append('--single-branch')
+        if recurse_submodules:
+            # Submodules are cloned in parallel as part of the clone, instead of a separate submodule update
+            args.append('--recurse-submodules')
+            if jobs is None:
+                jobs = SUBMODULE_JOBS
         if jobs is not None:
-            args += f' --jobs {jobs} '
+            args += ['--jobs', str(jobs)]
         if depth is not None:
-            args += f' --depth {depth} '
+            args += ['--depth', str(depth)]
         if origin is not None:
-            args += f' --origin {origin} '
+            args += ['--origin', origin]
 
         assert not (blobless and treeless)
         if blobless:
-            args += ' --filter=blob:none '
+            args.append('--filter=blob:none')
         elif treeless:
-            args += ' --filter=tree:0 '
+            args.append('--filter=tree:0')
+        if no_checkout:
+            # Combined with blobless, only refs and history are transferred, and blobs are fetched on demand later
+            args.append('--no-checkout')
 
-        return cmd.run(f'git clone {args} {url} {path}')
+        return cmd.run(['git', 'clone', *args, url, str(path)], shell=False)
 
     @classmethod
+    @invalidates_cache
     def push(cls, path: Path, remote: Optional[str] = None, local_branch: Optional[str] = None,
              remote_branch: Optional[str] = None, force: bool = False, set_upstream: bool = False) -> CompletedProcess:
         refspec = None
@@ -100,18 +113,16 @@ class GitOnline:
             remote_branch = local_branch
             refspec = f'refs/heads/{local_branch}:refs/heads/{remote_branch}'
 
-        remote = '' if remote is None else remote
-        refspec = '' if refspec is None else refspec
-
-        args = ''
+        args = []
         if force:
-            args += ' --force '
+            args.append('--force')
         if set_upstream:
-            args += ' --set-upstream '
+            args.append('--set-upstream')
 
-        return cmd.run(f'git push {args} {remote} {refspec}', cwd=path)
+        return cmd.run(['git', 'push', *args, *GitOnline._remote_args(remote, refspec)], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def fetch(cls, path: Path, prune: bool = False, prune_tags: bool = False, tags: bool = False,
               depth: Optional[int] = None, remote: Optional[str] = None, branch: Optional[str] = None,
               unshallow: bool = False, jobs: Optional[int] = None, fetch_all: bool = False,
@@ -122,50 +133,71 @@ class GitOnline:
             remote = ORIGIN if remote is None else remote
             refspec = f'refs/heads/{branch}:refs/remotes/{remote}/heads/{branch}'
 
-        remote = '' if remote is None else remote
-        refspec = '' if refspec is None else refspec
-
-        args = ''
+        args = []
         if prune:
-            args += ' --prune '
+            args.append('--prune')
         if prune_tags:
-            args += ' --prune-tags '
+            args.append('--prune-tags')
         if tags:
-            args += ' --tags '
+            args.append('--tags')
         if depth is not None:
-            args += f' --depth {depth}'
+            args += ['--depth', str(depth)]
         if unshallow:
-            args += ' --unshallow '
+            args.append('--unshallow')
         if jobs is not None:
-            args += ' --jobs '
+            args.append(f'--jobs={jobs}')
         if fetch_all:
-            args += ' --all '
+            args.append('--all')
+
+        return cmd.run(['git', 'fetch', *args, *GitOnline._remote_args(remote, refspec)], cwd=path,
+                       print_output=print_output, shell=False)
 
-        return cmd.run(f"git fetch {args} {remote} {refspec}", cwd=path, print_output=print_output)
+    @classmethod
+    def fetch_many(cls, paths: Iterable[Path], max_workers: int = MAX_JOBS, print_output: bool = False,
+                   **kwargs) -> Dict[Path, CompletedProcess]:
+        """Fetch many repos, with the fetches run concurrently
+
+        :param Iterable[Path] paths: Paths to git repos
+        :param int max_workers: Maximum number of git processes run in parallel
+        :param bool print_output: Whether to print git output, which is interleaved between repos
+        :param kwargs: Options passed to fetch for every repo
+        :return: Completed fetch processes keyed by repo path
+        """
+
+        return GitOnline._map_paths(lambda path: GitOnline.fetch(path, print_output=print_output, **kwargs), paths,
+                                    max_workers)
 
     @classmethod
+    @invalidates_cache
     def delete_remote_tag(cls, path: Path, tag: str, remote: Optional[str] = None,
                           force: bool = False) -> CompletedProcess:
         refspec = f':refs/tags/{tag}'
         remote = ORIGIN if remote is None else remote
-        args = ''
-        if force:
-            args += ' --force '
-        return cmd.run(f'git push {remote} {args} {refspec}', cwd=path)
+        args = ['--force'] if force else []
+        return cmd.run(['git', 'push', *args, remote, refspec], cwd=path, shell=False)
+
+    @classmethod
+    @invalidates_cache
+    def delete_remote_tags(cls, path: Path, tags: List[str], remote: Optional[str] = None,
+                           force: bool = False) -> CompletedProcess:
+        refspecs = [f':refs/tags/{tag}' for tag in tags]
+        remote = ORIGIN if remote is None else remote
+        args = ['--force'] if force else []
+        return cmd.run(['git', 'push', *args, remote, *refspecs], cwd=path, shell=False)
 
     @classmethod
+    @invalidates_cache
     def delete_remote_branch(cls, path: Path, branch: str, remote: str = ORIGIN,
                              force: bool = False) -> CompletedProcess:
         refspec = f':refs/heads/{branch}'
         remote = ORIGIN if remote is None else remote
-        args = ''
-        if force:
-            args += ' --force '
-        return cmd.run(f'git push {remote} {args} {refspec}', cwd=path)
+        args = ['--force'] if force else []
+        return cmd.run(['git', 'push', *args, remote, refspec], cwd=path, shell=False)
 
     @classmethod
+    @cached
     def branch_exists_at_remote_url(cls, url: str, branch: str) -> bool:
-        output = cmd.get_stdout(f'git ls-remote --heads {url} {branch}')
+        output = cmd.get_stdout(['git', 'ls-remote', '--heads', url, branch], shell=False)
         if output is None:
             # TODO: Should this return None?
             return False
@@ -173,82 +205,138 @@ class GitOnline:
 
     @classmethod
     def branch_exists_on_remote(cls, path: Path, branch: str, remote: str = ORIGIN) -> bool:
-        output = cmd.get_stdout(f'git ls-remote --heads {remote} {branch}', cwd=path)
-        if output is None:
-            # TODO: Should this return None?
-            return False
-        return bool(output)
+        # Within a cache session, repeated checks for the same remote share one ls-remote
+        return branch in GitOnline.get_remote_branches_info(path, remote=remote)
 
     @classmethod
+    @cached
     def get_default_branch(cls, url: str) -> Optional[str]:
         """Get default branch from remote repo"""
 
-        command = f'git ls-remote --symref {url} {HEAD}'
-        output = cmd.get_stdout(command)
+        # Expected output format:
+        # > git ls-remote --symref https://github.com/JrGoodle/pygoodle.git HEAD
+        # ref: refs/heads/main	HEAD
+        # 1ca96862f7814d9ec8b28fff17e913e11add342f	HEAD
+        output = cmd.get_stdout(['git', 'ls-remote', '--symref', url, HEAD], shell=False)
         if output is None:
             return None
-        output_list = output.split()
-        branch = [Format.remove_prefix(chunk, 'refs/heads/')
-                  for chunk in output_list if chunk.startswith('refs/heads/')]
-        return branch[0]
+        prefix = 'ref: refs/heads/'
+        symref, _, _ = output.partition('\t')
+        if not symref.startswith(prefix):
+            return None
+        return symref[len(prefix):]
 
     @classmethod
+    @invalidates_cache
     def submodule_update(cls, path: Path, init: bool = False, depth: Optional[int] = None, single_branch: bool = False,
                          jobs: Optional[int] = None, recursive: bool = False, remote: bool = False,
                          no_fetch: bool = False, checkout: bool = False, rebase: bool = False, merge: bool = False,
                          paths: Optional[List[Path]] = None) -> CompletedProcess:
-        args = ''
+        args = []
         if init:
-            args += ' --init '
+            args.append('--init')
         if single_branch:
-            args += ' --single-branch '
-        if jobs is not None:
-            args += f' --jobs {jobs} '
+            args.append('--single-branch')
+        if jobs is None:
+            jobs = SUBMODULE_JOBS
+        args += ['--jobs', str(jobs)]
         if depth is not None:
-            args += f' --depth {depth} '
-        if recursive is not None:
-            args += ' --recursive '
+            args += ['--depth', str(depth)]
+        if recursive:
+            args.append('--recursive')
         if remote:
-            args += ' --remote '
+            args.append('--remote')
         if no_fetch:
-            args += ' --no-fetch '
+            args.append('--no-fetch')
 
         # TODO: Validate that at most one of these is True
         if checkout:
-            args += ' --checkout '
+            args.append('--checkout')
         if merge:
-            args += ' --merge '
+            args.append('--merge')
         if rebase:
-            args += ' --rebase '
+            args.append('--rebase')
 
-        if paths is not None and paths:
-            paths = ' '.join([str(p) for p in paths])
-        else:
-            paths = ''
-        return cmd.run(f'git submodule update {args} {paths}', cwd=path)
+        paths = [] if paths is None else [str(p) for p in paths]
+        return cmd.run(['git', 'submodule', 'update', *args, *paths], cwd=path, shell=False)
 
     @classmethod
     def get_remote_tag_sha(cls, path: Path, name: str, remote: str = ORIGIN) -> Optional[str]:
-        tags = GitOnline.get_remote_tags_info(path, remote=remote)
-        sha = [sha for t, sha in tags.items() if t == name]
-        return sha[0] if sha else None
+        return GitOnline.get_remote_tags_info(path, remote=remote).get(name)
 
     @classmethod
     def get_remote_tags_info(cls, path: Path = Path.cwd(), remote: str = ORIGIN) -> Dict[str, str]:
-        output = cmd.get_stdout(f"git ls-remote --tags {remote}", cwd=path)
-        if output is None:
-            return {}
-        return ProcessOutput.tag_shas(output)
+        """Commit sha of every remote tag, listed without fetching any objects"""
+
+        return GitOnline.get_remote_refs_info(path, remote)[1]
+
+    @classmethod
+    @cached
+    def get_remote_refs_info(cls, path: Path, remote: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Commit sha of every remote branch and tag, listed with a single ls-remote call
+
+        :param Path path: Path to git repo
+        :param str remote: Remote name or url
+        :return: Branch shas and tag commit shas, keyed by name
+        """
+
+        args = ['git', 'ls-remote', '--heads', '--tags', remote]
+        # Parsed as git writes it, rather than reading the whole listing into one string first
+        try:
+            return ProcessOutput.remote_refs(cmd.iter_stdout(args, cwd=path, check=True))
+        except CalledProcessError:
+            skip_caching()
+            return {}, {}
 
     @classmethod
     def get_remote_tag(cls, path: Path, name: str, remote: str = ORIGIN) -> Optional[str]:
         tags = GitOnline.get_remote_tags_info(path, remote=remote)
-        tag = [t for t, sha in tags.items() if t == name]
-        return tag[0] if tag else None
+        return name if name in tags else None
 
     @classmethod
     def get_remote_branches_info(cls, path: Path = Path.cwd(), remote: str = ORIGIN) -> Dict[str, str]:
-        output = cmd.get_stdout(f'git ls-remote --heads {remote}', cwd=path)
-        if output is None:
+        return GitOnline.get_remote_refs_info(path, remote)[0]
+
+    @classmethod
+    def get_remote_tags_info_many(cls, paths: Iterable[Path], remote: str = ORIGIN,
+                                  max_workers: int = MAX_JOBS) -> Dict[Path, Dict[str, str]]:
+        """Remote tags of many repos, with the ls-remote calls run concurrently
+
+        :param Iterable[Path] paths: Paths to git repos
+        :param str remote: Remote name
+        :param int max_workers: Maximum number of git processes run in parallel
+        :return: Commit sha of every remote tag, keyed by repo path
+        """
+
+        return GitOnline._map_paths(lambda path: GitOnline.get_remote_tags_info(path, remote=remote), paths,
+                                    max_workers)
+
+    @classmethod
+    def get_remote_branches_info_many(cls, paths: Iterable[Path], remote: str = ORIGIN,
+                                      max_workers: int = MAX_JOBS) -> Dict[Path, Dict[str, str]]:
+        """Remote branches of many repos, with the ls-remote calls run concurrently
+
+        :param Iterable[Path] paths: Paths to git repos
+        :param str remote: Remote name
+        :param int max_workers: Maximum number of git processes run in parallel
+        :return: Commit sha of every remote branch, keyed by repo path
+        """
+
+        return GitOnline._map_paths(lambda path: GitOnline.get_remote_branches_info(path, remote=remote), paths,
+                                    max_workers)
+
+    @classmethod
+    def _map_paths(cls, func: Callable[[Path], T], paths: Iterable[Path], max_workers: int) -> Dict[Path, T]:
+        """Call func for each unique path in a bounded thread pool, since each call is blocked on the network"""
+
+        paths = list(dict.fromkeys(paths))
+        if not paths:
             return {}
-        return ProcessOutput.branch_shas(output)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+            return dict(zip(paths, executor.map(in_cache_session(func), paths)))
+
+    @classmethod
+    def _remote_args(cls, remote: Optional[str], refspec: Optional[str]) -> List[str]:
+        """Positional remote and refspec arguments, leaving out any that aren't set"""
+
+        return [arg for arg in (remote, refspec) if arg]
@@ -1,10 +1,18 @@
 """Misc git utils"""
 
-from typing import Dict, List, Optional, Tuple
+import re
+from configparser import ConfigParser, Error
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 from pygoodle.format import Format
 
-from .constants import FETCH_URL, PUSH_URL
+from .constants import FETCH_URL, HEAD, PUSH_URL
+
+# Refname, upstream, push, symref, object sha, peeled object sha, peeled object type
+RefInfo = Tuple[str, str, str, str, str, str, str]
+
+COMMITTER_LINE = re.compile(rb'^committer (.*)$', re.MULTILINE)
 
 # TODO: Update to use ConfigParser
 
@@ -12,40 +20,34 @@ from .constants import FETCH_URL, PUSH_URL
 class ProcessOutput:
 
     @classmethod
-    def tag_shas(cls, output: str) -> Dict[str, str]:
-        # TODO: Add expected output example
-
-        return ProcessOutput.shas(output, 'refs/tags/')
+    def remote_refs(cls, lines: Iterable[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Branch shas and tag commit shas, with annotated tags peeled to the commit they point to"""
 
-    @classmethod
-    def branch_shas(cls, output: str) -> Dict[str, str]:
         # Expected output format:
-        # 6def4cee3c6abe73ab2889d155421a90722282ef	refs/heads/gh-pages
-        # bc787b2888acf4b7bd8351b9a72982c71c143362	refs/heads/master
-        # 1ca96862f7814d9ec8b28fff17e913e11add342f	refs/heads/presentation
-        # d3db093e48bd685b7eaf8da9cedcef3c9ef48b29	refs/heads/wip/force-sync
-
-        return ProcessOutput.shas(output, 'refs/heads/')
+        # > git ls-remote --heads --tags origin
+        # 1ca96862f7814d9ec8b28fff17e913e11add342f	refs/heads/main
+        # 1ca96862f7814d9ec8b28fff17e913e11add342f	refs/tags/v1
+        # 6def4cee3c6abe73ab2889d155421a90722282ef	refs/tags/v2
+        # bc787b2888acf4b7bd8351b9a72982c71c143362	refs/tags/v2^{}
 
-    @classmethod
-    def shas(cls, output: str, prefix: str) -> Dict[str, str]:
-        # TODO: Add expected output example
-
-        lines = output.strip().splitlines()
-        items = {}
+        heads_prefix = 'refs/heads/'
+        tags_prefix = 'refs/tags/'
+        peeled = '^{}'
+        branches = {}
+        tags = {}
+        peeled_tags = {}
         for line in lines:
-            components = line.split()
-            sha = components[0].strip()
-            name = Format.remove_prefix(components[1], prefix)
-            items[name] = sha
-        return items
-
-    @classmethod
-    def local_branches(cls, output: str) -> List[str]:
-        # TODO: Add expected output example
-
-        lines = output.splitlines()
-        return [line.split()[1].strip() if line.startswith('*') else line.strip() for line in lines]
+            sha, _, ref = line.partition('\t')
+            if ref.startswith(heads_prefix):
+                branches[ref[len(heads_prefix):]] = sha
+            elif ref.startswith(tags_prefix):
+                name = ref[len(tags_prefix):]
+                if name.endswith(peeled):
+                    peeled_tags[name[:-len(peeled)]] = sha
+                else:
+                    tags[name] = sha
+        commits = {name: peeled_tags.get(name, sha) for name, sha in tags.items()}
+        return branches, commits
 
     @classmethod
     def tracking_branches(cls, output: str) -> Tuple[str, Optional[str]]:
@@ -55,37 +57,84 @@ class ProcessOutput:
         # > git rev-parse --symbolic-full-name git-old@{upstream}
         # refs/remotes/origin/git
 
-        if output.startswith('refs/heads'):
-            remote = None
-            branch = Format.remove_prefix('refs/heads', output)
-        elif output.startswith('refs/remotes'):
-            components = Format.remove_prefix('refs/remotes', output).split('/')
-            remote = components[0]
-            branch = components[1]
-        else:
-            raise Exception('Failed to parse tracking branch output')
-        return branch, remote
+        heads_prefix = 'refs/heads/'
+        remotes_prefix = 'refs/remotes/'
+        if output.startswith(heads_prefix):
+            return output[len(heads_prefix):], None
+        if output.startswith(remotes_prefix):
+            remote, _, branch = output[len(remotes_prefix):].partition('/')
+            if branch:
+                return branch, remote
+        raise Exception('Failed to parse tracking branch output')
 
     @classmethod
-    def remote_branches(cls, output: str, remote: str) -> Tuple[List[str], Optional[str]]:
-        # TODO: Add expected output example
+    def refs(cls, lines: Iterable[str]) -> List[RefInfo]:
+        # Expected output format:
+        # > git for-each-ref --format='%(refname) %(upstream) %(push) %(symref) %(objectname) %(*objectname) \
+        #   %(*objecttype)' refs/heads refs/remotes refs/tags
+        # refs/heads/main refs/remotes/origin/main refs/remotes/origin/main  1ca96862f7814d9ec8b28fff17e913e11add342f
+        # refs/heads/local    1ca96862f7814d9ec8b28fff17e913e11add342f
+        # refs/remotes/origin/HEAD   refs/remotes/origin/main 1ca96862f7814d9ec8b28fff17e913e11add342f
+        # refs/remotes/origin/main    1ca96862f7814d9ec8b28fff17e913e11add342f
+        # refs/tags/v1    1ca96862f7814d9ec8b28fff17e913e11add342f
+        # refs/tags/v2    6def4cee3c6abe73ab2889d155421a90722282ef bc787b2888acf4b7bd8351b9a72982c71c143362 commit
 
-        lines = output.strip().splitlines()
-        branches = []
-        default_branch = None
+        refs = []
         for line in lines:
-            components = line.split()
-            if components[0] == 'warning:':
+            if not line:
                 continue
-            if len(components) == 1:
-                name = Format.remove_prefix(components[0].strip(), f'{remote}/')
-                branches.append(name)
-            elif len(components) == 3 and components[1] == '->':
-                name = Format.remove_prefix(components[2].strip(), f'{remote}/')
-                default_branch = name
+            fields = line.split(' ')
+            fields += [''] * (7 - len(fields))
+            refs.append(tuple(fields[:7]))
+        return refs
+
+    @classmethod
+    def local_tags(cls, refs: List[RefInfo]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Tag shas and commit shas, with annotated tags peeled to the commit they point to
+
+        Tags of tags are left out of the commit shas, since for-each-ref only peels a single level
+        """
+
+        # Expected input format:
+        # ('refs/tags/v1', '', '', '', '1ca96862f7814d9ec8b28fff17e913e11add342f', '', '')
+        # ('refs/tags/v2', '', '', '', '6def4cee3c6abe73ab2889d155421a90722282ef',
+        #  'bc787b2888acf4b7bd8351b9a72982c71c143362', 'commit')
+
+        prefix = 'refs/tags/'
+        tags = {}
+        commits = {}
+        for refname, _, _, _, sha, peeled_sha, peeled_type in refs:
+            if not refname.startswith(prefix):
+                continue
+            # Prefix was just checked, so slice it off directly
+            name = refname[len(prefix):]
+            tags[name] = sha
+            if not peeled_sha:
+                commits[name] = sha
+            elif peeled_type == 'commit':
+                commits[name] = peeled_sha
+        return tags, commits
+
+    @classmethod
+    def all_remote_branches(cls, refs: List[RefInfo]) -> Dict[str, Tuple[List[str], Optional[str]]]:
+        # Expected input format:
+        # ('refs/remotes/origin/HEAD', '', '', 'refs/remotes/origin/main', '1ca9686...', '', '')
+        # ('refs/remotes/origin/main', '', '', '', '1ca9686...', '', '')
+        # ('refs/remotes/upstream/feature/branch', '', '', '', '6def4ce...', '', '')
+
+        prefix = 'refs/remotes/'
+        remotes = {}
+        for refname, _, _, symref, _, _, _ in refs:
+            if not refname.startswith(prefix):
+                continue
+            remote, name = refname[len(prefix):].split('/', 1)
+            branches, default_branch = remotes.setdefault(remote, ([], None))
+            if symref:
+                default_branch = Format.remove_prefix(symref, f'refs/remotes/{remote}/')
+                remotes[remote] = (branches, default_branch)
             else:
-                raise Exception('Wrong number of components for remote branch')
-        return branches, default_branch
+                branches.append(name)
+        return remotes
 
     @classmethod
     def remotes(cls, output: str) -> Dict[str, Dict[str, str]]:
@@ -93,23 +142,58 @@ class ProcessOutput:
         # origin	git@github.com:JrGoodle/pygoodle.git (fetch)
         # origin	git@github.com:JrGoodle/pygoodle.git (push)
 
-        lines = output.splitlines()
-        line = [line.split() for line in lines]
         remotes = {}
-        for components in line:
-            name = components[0].strip()
-            url = components[1].strip()
-            kind = components[2].strip()
-            if name not in remotes.keys():
-                remotes[name] = {}
+        for line in output.splitlines():
+            name, _, entry = line.partition('\t')
+            url, _, kind = entry.rpartition(' ')
+            remote = remotes.setdefault(name, {})
             if kind == '(fetch)':
-                remotes[name][FETCH_URL] = url
+                remote[FETCH_URL] = url
             elif kind == '(push)':
-                remotes[name][PUSH_URL] = url
+                remote[PUSH_URL] = url
             else:
                 raise Exception('Unknown')
         return remotes
 
+    @classmethod
+    def status(cls, lines: Iterable[str]) -> Dict[str, Union[Optional[str], int, bool]]:
+        # Expected output format:
+        # > git status --porcelain=v2 --branch
+        # # branch.oid 6def4cee3c6abe73ab2889d155421a90722282ef
+        # # branch.head main
+        # # branch.upstream origin/main
+        # # branch.ab +1 -0
+        # 1 .M N... 100644 100644 100644 <head sha> <index sha> README.md
+        # ? untracked.txt
+
+        status = {
+            'branch': None,
+            'sha': None,
+            'ahead': 0,
+            'behind': 0,
+            'dirty': False,
+            'untracked': False
+        }
+        for line in lines:
+            if line.startswith('# branch.head '):
+                branch = line[len('# branch.head '):]
+                status['branch'] = HEAD if branch == '(detached)' else branch
+            elif line.startswith('# branch.oid '):
+                sha = line[len('# branch.oid '):]
+                status['sha'] = None if sha == '(initial)' else sha
+            elif line.startswith('# branch.ab '):
+                ahead, behind = line[len('# branch.ab '):].split()
+                status['ahead'] = int(ahead)
+                status['behind'] = -int(behind)
+            elif line.startswith('?'):
+                status['untracked'] = True
+            elif line[:1] in ('1', '2', 'u'):
+                status['dirty'] = True
+            if status['dirty'] and status['untracked']:
+                # Branch headers come first, so nothing left to learn from the remaining entries
+                break
+        return status
+
     @classmethod
     def submodules(cls, output: List[str]) -> Dict[str, Dict[str, str]]:
         # Expected output format for .gitmodules:
@@ -123,17 +207,96 @@ class ProcessOutput:
 
         submodules = {}
         for submodule_info in output:
-            info_components = submodule_info.split()
-            name = info_components[0]
-            value = info_components[1]
-            name_components = name.split('.')
-            if len(name_components) != 3 or name_components[0] != 'submodule':
+            name, _, value = submodule_info.partition(' ')
+            section, _, subsection = name.partition('.')
+            # Submodule names can contain dots, but keys can't, so the key is after the last one
+            submodule_path, _, key = subsection.rpartition('.')
+            if section != 'submodule' or not submodule_path:
                 continue
-            submodule_path = name_components[1]
-            key = name_components[2]
-            if submodule_path not in submodules.keys():
-                submodules[submodule_path] = {}
-            submodules[submodule_path][key] = value
+            submodules.setdefault(submodule_path, {})[key] = value
+        return submodules
+
+    @classmethod
+    def submodule_commits(cls, output: str) -> Dict[str, str]:
+        """Commit sha of every submodule entry, keyed by submodule path"""
+
+        # Expected output format, with entries separated by NUL:
+        # > git ls-tree -z HEAD -- libs/sub README.md
+        # 100644 blob e69de29bb2d1d6434b8b29ae775ad8c2e48c5391\tREADME.md
+        # 160000 commit 1ca96862f7814d9ec8b28fff17e913e11add342f\tlibs/sub
+
+        commits = {}
+        for entry in output.split('\0'):
+            info, _, submodule_path = entry.partition('\t')
+            components = info.split()
+            if len(components) != 3 or components[1] != 'commit':
+                continue
+            commits[submodule_path] = components[2]
+        return commits
+
+    @classmethod
+    def lfs_files(cls, output: str) -> Dict[str, bool]:
+        """Whether each lfs file is only a pointer, keyed by file path"""
+
+        # Expected output format, with '*' for full objects and '-' for pointers:
+        # > git lfs ls-files
+        # 3c2ed4e6b1 * images/logo.png
+        # 9a4f6b0c2e - video/intro.mp4
+
+        files = {}
+        for line in output.splitlines():
+            components = line.split(maxsplit=2)
+            if len(components) != 3:
+                continue
+            _, marker, file = components
+            files[file] = marker == '-'
+        return files
+
+    @classmethod
+    def config(cls, output: str) -> Dict[str, List[str]]:
+        """Git config values in order of precedence, keyed by variable name"""
+
+        # Expected output format, with entries separated by NUL and valueless keys having no newline:
+        # > git config --list -z
+        # core.bare\nfalse
+        # branch.main.merge\nrefs/heads/main
+        # core.valueless
+
+        config = {}
+        for entry in output.split('\0'):
+            if not entry:
+                continue
+            key, _, value = entry.partition('\n')
+            config.setdefault(key, []).append(value)
+        return config
+
+    @classmethod
+    def submodules_config(cls, contents: str) -> Optional[Dict[str, Dict[str, str]]]:
+        """Submodule sections of git config file contents, or None if the file can't be parsed as ini
+
+        :param str contents: Contents of .gitmodules or .git/config
+        :return: Submodule values keyed by submodule name
+        """
+
+        # Expected file format:
+        # [submodule "path/to/Optional"]
+        # 	path = path/to/Optional
+        # 	url = https://github.com/akrzemi1/Optional.git
+        # 	branch = master
+
+        # Git allows repeated keys and sections, the last value wins like with git config --get
+        parser = ConfigParser(strict=False, interpolation=None)
+        try:
+            parser.read_string(contents)
+        except Error:
+            return None
+        submodules = {}
+        prefix = 'submodule "'
+        for section in parser.sections():
+            if not section.startswith(prefix) or not section.endswith('"'):
+                continue
+            name = section[len(prefix):-1]
+            submodules[name] = {key: value.strip('"') for key, value in parser.items(section)}
         return submodules
 
     @classmethod
@@ -179,3 +342,45 @@ class ProcessOutput:
             }
             changes[diff_type(change_type)].append(change)
         return changes
+
+    @classmethod
+    def commit_message(cls, contents: bytes) -> Optional[str]:
+        """Message of raw commit object, matching ``git log --format=%B``"""
+
+        # Expected object format:
+        # > git cat-file commit HEAD
+        # tree 4b825dc642cb6eb9a060e54bf8d69288fbee4904
+        # author Joe DeCapo <joe@polka.cat> 1600000000 -0500
+        # committer Joe DeCapo <joe@polka.cat> 1600000000 -0500
+        #
+        # Commit message
+
+        _, _, message = contents.partition(b'\n\n')
+        message = message.decode(errors='replace').strip()
+        if not message:
+            return None
+        return message
+
+    @classmethod
+    def commit_timestamp(cls, contents: bytes) -> Optional[str]:
+        """Committer date of raw commit object in strict ISO 8601, matching ``git log --format=%cI``"""
+
+        # Expected committer line format, with the timezone offset of the committer:
+        # committer Joe DeCapo <joe@polka.cat> 1600000000 -0500
+
+        # Scanned as bytes so only the timestamp and offset are converted, not the whole header and signature
+        header, _, _ = contents.partition(b'\n\n')
+        match = COMMITTER_LINE.search(header)
+        if match is None:
+            return None
+        components = match.group(1).rsplit(maxsplit=2)
+        if len(components) != 3:
+            return None
+        _, seconds, offset = components
+        try:
+            sign = -1 if offset.startswith(b'-') else 1
+            minutes = sign * (int(offset[1:3]) * 60 + int(offset[3:5]))
+            zone = timezone(timedelta(minutes=minutes))
+            return datetime.fromtimestamp(int(seconds), zone).isoformat()
+        except (ValueError, OverflowError, OSError):
+            return None
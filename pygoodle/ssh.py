@@ -6,24 +6,41 @@
 
 # import base64
 
+import atexit
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import CalledProcessError
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
 import paramiko
 
+from pygoodle.error import SecureShellError
+
+KEEPALIVE_INTERVAL: int = 30
+
 
 class SecureShellCompletedProcess:
 
-    def __init__(self, stdin, stdout, stderr):
+    def __init__(self, stdin, stdout, stderr, returncode: Optional[int] = None):
         self.stdin = stdin
         self.stdout: str = stdout
         self.stderr: str = stderr
+        self.returncode: Optional[int] = returncode
 
 
 class SecureShell:
 
+    _shared: Dict[Tuple[str, str], 'SecureShell'] = {}
+    _shared_lock: Lock = Lock()
+
     def __init__(self, url: str, user: str, password: str):
         # key = paramiko.RSAKey(data=str(base64.b64decode(b'AAA...')))
         self._client = paramiko.SSHClient()
         # client.get_host_keys().add(ENVIRONMENT.pygoodle_url, 'ssh-rsa', key)
         self._client.connect(url, username=user, password=password)
+        self._transport: paramiko.Transport = self._client.get_transport()
+        self._transport.set_keepalive(KEEPALIVE_INTERVAL)
 
     def __enter__(self):
         return self
@@ -34,6 +51,104 @@ class SecureShell:
     def close(self) -> None:
         self._client.close()
 
+    @property
+    def is_active(self) -> bool:
+        return self._transport is not None and self._transport.is_active()
+
+    @classmethod
+    def shared(cls, url: str, user: str, password: str) -> 'SecureShell':
+        """Connection reused across callers, reconnecting only if the previous one dropped
+
+        Shared connections are closed at exit, so callers shouldn't close them or use them as a context manager
+
+        :param str url: Host to connect to
+        :param str user: User to connect as
+        :param str password: Password for user
+        :return: Connected shell
+        """
+
+        key = (url, user)
+        with cls._shared_lock:
+            shell = cls._shared.get(key)
+            if shell is None or not shell.is_active:
+                shell = SecureShell(url, user, password)
+                cls._shared[key] = shell
+            return shell
+
+    @classmethod
+    def close_shared(cls) -> None:
+        """Close all shared connections"""
+
+        with cls._shared_lock:
+            for shell in cls._shared.values():
+                shell.close()
+            cls._shared.clear()
+
     def run_command(self, command: str) -> SecureShellCompletedProcess:
         stdin, stdout, stderr = self._client.exec_command(command)
-        return SecureShellCompletedProcess(stdin, stdout, stderr)
+        stdin.close()
+        output, error = self._read(stdout, stderr)
+        returncode = stdout.channel.recv_exit_status()
+        return SecureShellCompletedProcess(stdin, output, error, returncode)
+
+    @staticmethod
+    def _read(stdout, stderr) -> Tuple[str, str]:
+        """Read stdout and stderr to the end
+
+        Both streams share the channel window, so stderr is drained concurrently, otherwise a command writing
+        enough to stderr would block before closing stdout
+        """
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            error_future = executor.submit(stderr.read)
+            output = stdout.read()
+            error = error_future.result()
+        return output.decode(), error.decode()
+
+    def run_commands(self, commands: List[str], check: bool = True) -> List[SecureShellCompletedProcess]:
+        """Run commands in order over a single channel
+
+        Each command's output is followed by a separator with a random marker and its exit status, so output is
+        split per command. Commands after a failing one aren't run
+
+        :param List[str] commands: Commands to run
+        :param bool check: Whether to raise CalledProcessError if a command fails
+        :return: Completed process for each command that ran, ending with the failing command if check is False
+        """
+
+        if not commands:
+            return []
+        marker = uuid.uuid4().hex
+        script = '\n'.join(f'{command}\n'
+                           f's=$?; printf "\\n%s %d\\n" {marker} "$s"; printf "\\n%s\\n" {marker} >&2; '
+                           f'[ "$s" -eq 0 ] || exit "$s"'
+                           for command in commands)
+        stdin, stdout, stderr = self._client.exec_command(script)
+        stdin.close()
+        output, error = self._read(stdout, stderr)
+        exit_status = stdout.channel.recv_exit_status()
+
+        output_separator = f'\n{marker} '
+        errors = error.split(f'\n{marker}\n')
+        results = []
+        for command, command_error in zip(commands, errors):
+            command_output, separator, output = output.partition(output_separator)
+            if separator:
+                status, _, output = output.partition('\n')
+                returncode = int(status)
+            elif exit_status != 0:
+                # Command exited the shell before its separator was written
+                returncode = exit_status
+            else:
+                break
+            results.append(SecureShellCompletedProcess(None, command_output, command_error, returncode))
+            if returncode != 0:
+                if check:
+                    raise CalledProcessError(returncode, command, command_output, command_error)
+                return results
+        if len(results) != len(commands):
+            raise SecureShellError(f'Output of {len(commands) - len(results)} commands is missing')
+        return results
+
+
+atexit.register(SecureShell.close_shared)
@@ -54,11 +54,12 @@ class ProgressTaskPool(TaskPool):
 
     def before_tasks(self, tasks: List[ProgressTask]) -> None:
         super().before_tasks(tasks)
+        progress = self.progress
         if self._print_subprogress:
             for task in tasks:
-                task.progress = self.progress
-        self.progress.start()
-        self.progress.add_task(self._title, total=len(tasks), units=self._units)
+                task.progress = progress
+        progress.start()
+        progress.add_task(self._title, total=len(tasks), units=self._units)
 
     def after_task(self, task: ProgressTask) -> None:
         super().after_task(task)
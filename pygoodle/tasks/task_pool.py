@@ -4,14 +4,15 @@
 
 """
 
-from threading import Lock
-from typing import Any, List, Optional
-
-import trio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
 
 from pygoodle.console import disable_output
 from pygoodle.util import values_sorted_by_key
 
+# Maximum tasks run at once when no job limit is given, the same as trio's default thread limit
+DEFAULT_JOBS: int = 40
+
 
 class Task:
 
@@ -48,8 +49,7 @@ class TaskPool:
 
     def __init__(self, jobs: Optional[int] = None):
         self._jobs: Optional[int] = jobs
-        self._lock: Lock = Lock()
-        self._results: Optional[List[Any]] = None
+        self._results: Optional[Dict[int, Any]] = None
         self.cancelled: bool = False
 
     def __enter__(self):
@@ -72,24 +72,20 @@ class TaskPool:
 
     @disable_output
     def run(self, tasks: List[Task]) -> List[Any]:
-        return trio.run(self._run, tasks)
-
-    async def _run(self, tasks: List[Task]) -> List[Any]:
         try:
-            async with trio.open_nursery() as nursery:
-                limit = None if self._jobs is None else trio.CapacityLimiter(self._jobs)
-                self.before_tasks(tasks)
-                self._results = {}
-                index = 0
+            self.before_tasks(tasks)
+            self._results = {}
+            jobs = DEFAULT_JOBS if self._jobs is None else self._jobs
+            jobs = max(min(jobs, len(tasks)), 1)
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                futures = [executor.submit(self._run_task, index, task) for index, task in enumerate(tasks)]
                 try:
-                    for task in tasks:
-                        if limit is not None:
-                            await limit.acquire_on_behalf_of(task.name)
-                        nursery.start_soon(self._run_task, index, task, limit, nursery)
-                        index += 1
+                    for future in as_completed(futures):
+                        future.result()
                 except BaseException:
-                    nursery.cancel_scope.cancel()
                     self.cancelled = True
+                    for future in futures:
+                        future.cancel()
                     raise
             return values_sorted_by_key(self._results)
         except BaseException:
@@ -98,21 +94,18 @@ class TaskPool:
         finally:
             self.after_tasks(tasks)
 
-    async def _run_task(self, index: int, task: Task, limit: Optional[trio.CapacityLimiter],
-                        nursery: trio.Nursery) -> Any:
+    def _run_task(self, index: int, task: Task) -> None:
+        if self.cancelled:
+            return
         with task.in_pool(self):
             try:
                 self.before_task(task)
                 task.before_task()
-                result = await trio.to_thread.run_sync(task.run)
-                with self._lock:
-                    self._results[index] = result
+                # Results are keyed by index to keep task order, dict assignment is atomic so no lock is needed
+                self._results[index] = task.run()
             except BaseException:
                 self.cancelled = True
-                nursery.cancel_scope.cancel()
                 raise
             finally:
                 task.after_task()
                 self.after_task(task)
-                if limit is not None:
-                    limit.release_on_behalf_of(task.name)
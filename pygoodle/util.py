@@ -33,4 +33,4 @@ def sorted_tuple(items: MutableSequence[T], unique: bool = False, reverse: bool
 
 
 def values_sorted_by_key(dictionary: Dict[Any, T]) -> List[T]:
-    return [dictionary[key] for key in sorted(dictionary.keys())]
+    return [dictionary[key] for key in sorted(dictionary)]
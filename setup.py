@@ -37,7 +37,6 @@ setup(
         'pick',
         'PyYAML',
         'resource_pool',
-        'rich',
-        'trio'
+        'rich'
     ]
 )